@@ -0,0 +1,70 @@
+from __future__ import annotations
+from typing import Optional
+
+
+# How many leading body bytes the crawler buffers before deciding what it is
+SNIFF_BYTES = 1024
+
+_BINARY_MAGIC = (
+    b"PK\x03\x04",  # zip / docx / xlsx / epub
+    b"\x1f\x8b",  # gzip
+    b"7z\xbc\xaf\x27\x1c",
+    b"Rar!",
+    b"\x89PNG",
+    b"GIF8",
+    b"\xff\xd8\xff",  # jpeg
+    b"RIFF",  # wav / avi / webp
+    b"OggS",
+    b"ID3",  # mp3
+    b"fLaC",
+    b"\x1a\x45\xdf\xa3",  # mkv / webm
+    b"\x00\x00\x01\xba",  # mpeg
+    b"wOFF",
+    b"wOF2",
+    b"\x7fELF",
+)
+
+_HTML_TYPES = ("text/html", "application/xhtml+xml", "text/xml", "application/xml")
+_BINARY_TYPE_PREFIXES = ("image/", "video/", "audio/", "font/", "application/zip", "application/x-")
+
+
+def sniff_content_kind(content_type: Optional[str], head: bytes) -> str:
+    """
+    Classify a response from its Content-Type and first bytes.
+    Returns "html", "text", "pdf" or "binary". Magic bytes win over the header,
+    since servers often mislabel PDFs and downloads.
+    """
+    ct = (content_type or "").split(";", 1)[0].strip().lower()
+
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(_BINARY_MAGIC) or head[4:8] == b"ftyp":  # ftyp: mp4 / mov
+        return "binary"
+    if ct == "application/pdf":
+        return "pdf"
+
+    stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    looks_markup = stripped.startswith(b"<") or b"<html" in stripped or b"<body" in stripped
+    looks_text = b"\x00" not in head
+
+    if ct in _HTML_TYPES:
+        return "html" if looks_text else "binary"
+    if ct == "text/plain" or (ct.startswith("text/") and looks_text):
+        return "html" if looks_markup else "text"
+    if ct.startswith(_BINARY_TYPE_PREFIXES):
+        return "binary"
+
+    # Missing or generic type (e.g. application/octet-stream): trust the bytes
+    if looks_markup and looks_text:
+        return "html"
+    if looks_text and _mostly_printable(head):
+        return "text"
+    return "binary"
+
+
+def _mostly_printable(head: bytes) -> bool:
+    if not head:
+        return True
+    text = head.decode("utf-8", errors="replace")
+    bad = sum(1 for c in text if c == "�" or (ord(c) < 32 and c not in "\n\r\t\f"))
+    return bad / max(1, len(text)) < 0.05
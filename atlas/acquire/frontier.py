@@ -0,0 +1,146 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import lxml.html
+
+from atlas.acquire.bloom import BloomFilter
+from atlas.acquire.url_canon import canonicalize_url
+from atlas.acquire.web_crawler import CrawlResult
+from atlas.store.http_cache import load_outlinks
+
+
+# Links to these are never worth fetching as documents
+_SKIP_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js",
+    ".zip", ".gz", ".tar", ".mp3", ".mp4", ".avi", ".mov", ".woff", ".woff2",
+)
+
+
+def _site_key(host: str) -> str:
+    return host[4:] if host.startswith("www.") else host
+
+
+def extract_links(base_url: str, html: str) -> List[str]:
+    """
+    Absolute http(s) links from <a href> in html, canonicalized, in document order.
+    """
+    if not html:
+        return []
+    try:
+        root = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return []
+    base = root.xpath("string(//base/@href)") or base_url
+    base = urljoin(base_url, base)
+
+    links: List[str] = []
+    for href in root.xpath("//a/@href"):
+        href = href.strip()
+        if not href or href.startswith(("#", "mailto:", "javascript:", "tel:", "data:")):
+            continue
+        absolute = urljoin(base, href)
+        if urlsplit(absolute).scheme not in ("http", "https"):
+            continue
+        canon = canonicalize_url(absolute)
+        if urlsplit(canon).path.lower().endswith(_SKIP_EXTENSIONS):
+            continue
+        links.append(canon)
+    return links
+
+
+class Frontier:
+    """
+    Priority frontier for link-following crawls.
+
+    URLs are canonicalized and checked against a Bloom filter seen-set before
+    they are queued, and popped shallowest-first (ties in discovery order).
+    urls() is an async iterator suitable as input to iter_crawl_indexed; the
+    consumer reports each result back with done(), which queues its links.
+    Iteration ends when the frontier is empty and no fetched page is still
+    waiting to report links, or after max_pages URLs.
+
+    With http_cache_db, a page that comes back not modified has no body to
+    take links from; the links stored with its validators are queued instead.
+    """
+
+    def __init__(
+        self,
+        seeds: Iterable[str],
+        max_pages: int = 1000,
+        max_depth: int = 2,
+        same_site: bool = True,
+        seen_capacity: int = 10_000_000,
+        seen_error_rate: float = 0.001,
+        max_queued: int = 1_000_000,
+        http_cache_db: Optional[Path] = None,
+    ) -> None:
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.same_site = same_site
+        self.max_queued = max_queued
+        self.http_cache_db = http_cache_db
+        self.seen = BloomFilter(seen_capacity, seen_error_rate)
+        self.allowed_sites: Set[str] = set()
+        self.dropped = 0  # discovered links not queued because the frontier was full
+
+        self._heap: List[Tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        self._outstanding: Dict[str, int] = {}  # URL handed to the crawler -> depth
+        self._emitted = 0
+        self._changed = asyncio.Event()
+
+        for s in seeds:
+            canon = canonicalize_url(s)
+            self.allowed_sites.add(_site_key(urlsplit(canon).hostname or ""))
+            self._push(canon, 0)
+
+    def _push(self, url: str, depth: int) -> None:
+        if depth > self.max_depth:
+            return
+        if self.same_site and _site_key(urlsplit(url).hostname or "") not in self.allowed_sites:
+            return
+        if not self.seen.add(url):
+            return
+        if len(self._heap) >= self.max_queued:
+            self.dropped += 1
+            return
+        heapq.heappush(self._heap, (depth, next(self._seq), url))
+
+    async def urls(self) -> AsyncIterator[str]:
+        while self._emitted < self.max_pages:
+            if self._heap:
+                depth, _, url = heapq.heappop(self._heap)
+                self._outstanding[url] = depth
+                self._emitted += 1
+                yield url
+                continue
+            if not self._outstanding:
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+    def done(self, result: CrawlResult) -> Optional[List[str]]:
+        """
+        Report a finished fetch; queues the page's links one level deeper.
+        Returns the links, for storing with the page's validators: with
+        http_cache_db they are read from every fetched body, since a later
+        run may only get a 304 for it.
+        """
+        depth = self._outstanding.pop(result.url, None)
+        follow = depth is not None and depth < self.max_depth
+        links = None
+        if result.not_modified:
+            if follow and self.http_cache_db is not None:
+                links = load_outlinks(self.http_cache_db, result.url)
+        elif result.ok and result.html and (follow or self.http_cache_db is not None):
+            links = extract_links(result.final_url or result.url, result.html)
+        if follow and links:
+            for link in links:
+                self._push(link, depth + 1)
+        self._changed.set()
+        return links
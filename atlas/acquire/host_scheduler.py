@@ -0,0 +1,246 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+@dataclass
+class CrawlItem:
+    index: int
+    url: str
+    host: str
+    attempt: int = 0
+
+
+@dataclass
+class _HostState:
+    tokens: float
+    last_refill: float
+    active: int = 0
+    blocked_until: float = 0.0
+    scheduled: bool = False
+    queue: Deque[CrawlItem] = field(default_factory=deque)
+    parked: Deque[CrawlItem] = field(default_factory=deque)  # over the per-host pending cap
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def backoff_delay(attempt: int, base_s: float = 1.0, max_s: float = 60.0) -> float:
+    """
+    Exponential backoff with jitter: uniform in [d/2, d] for d = base * 2^attempt.
+    """
+    d = min(max_s, base_s * (2 ** attempt))
+    return random.uniform(d / 2, d)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP-date) into seconds from now.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostScheduler:
+    """
+    Per-host politeness for the crawler.
+
+    Each host gets a token bucket (rate_per_host requests/s, up to `burst`
+    banked), a cap on concurrent connections, and a "blocked until" time set
+    from Retry-After / 429 responses. Workers call get() and receive a URL from
+    whichever host is ready now, so a throttled host never holds a worker slot
+    while other hosts have work. Retries are re-queued with a delay rather
+    than slept on inside the worker.
+
+    At most max_pending_per_host (default max_pending / 10) of the
+    max_pending queued URLs belong to one host. Further URLs for that host
+    are parked outside the pending pool and move into its queue one at a
+    time as it drains, so a slow or throttled host cannot fill the pool and
+    stall put() for every other host. put() waits on parking only once
+    max_parked URLs (default 100 * max_pending) are parked.
+    """
+
+    def __init__(
+        self,
+        rate_per_host: float = 5.0,
+        burst: int = 10,
+        max_conns_per_host: int = 6,
+        max_pending: int = 10_000,
+        max_pending_per_host: Optional[int] = None,
+        max_parked: Optional[int] = None,
+    ) -> None:
+        self.rate_per_host = rate_per_host
+        self.burst = max(1, burst)
+        self.max_conns_per_host = max(1, max_conns_per_host)
+        self.max_pending = max(1, max_pending)
+        self.max_pending_per_host = max(1, max_pending_per_host or self.max_pending // 10)
+        self.max_parked = max(1, max_parked or 100 * self.max_pending)
+
+        self._hosts: Dict[str, _HostState] = {}
+        self._ready: List[Tuple[float, int, str]] = []  # (ready_at, seq, host)
+        self._delayed: List[Tuple[float, int, CrawlItem]] = []  # retries: (due_at, seq, item)
+        self._seq = itertools.count()
+        self._pending = 0  # queued or delayed, not in flight
+        self._parked = 0
+        self._inflight = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _state(self, host: str, now: float) -> _HostState:
+        st = self._hosts.get(host)
+        if st is None:
+            st = _HostState(tokens=float(self.burst), last_refill=now)
+            self._hosts[host] = st
+        return st
+
+    def _schedule(self, host: str, st: _HostState, at: float) -> None:
+        if not st.scheduled:
+            st.scheduled = True
+            heapq.heappush(self._ready, (at, next(self._seq), host))
+
+    def _enqueue(self, item: CrawlItem, now: float) -> None:
+        st = self._state(item.host, now)
+        st.queue.append(item)
+        if st.active < self.max_conns_per_host:
+            self._schedule(item.host, st, now)
+
+    def _wait_for_token(self, st: _HostState, now: float) -> float:
+        if self.rate_per_host <= 0:
+            return 0.0
+        st.tokens = min(float(self.burst), st.tokens + (now - st.last_refill) * self.rate_per_host)
+        st.last_refill = now
+        if st.tokens >= 1.0:
+            return 0.0
+        return (1.0 - st.tokens) / self.rate_per_host
+
+    def _saturated(self, st: Optional[_HostState]) -> bool:
+        # Parked URLs stay behind the host's queued ones, keeping its order
+        return st is not None and (bool(st.parked) or len(st.queue) >= self.max_pending_per_host)
+
+    async def put(self, index: int, url: str) -> None:
+        """
+        Add a URL; waits while max_pending URLs are already queued, or, for a
+        host at its pending cap, while max_parked URLs are already parked.
+        """
+        host = host_of(url)
+
+        def admissible() -> bool:
+            if self._saturated(self._hosts.get(host)):
+                return self._parked < self.max_parked
+            return self._pending < self.max_pending
+
+        async with self._cond:
+            await self._cond.wait_for(admissible)
+            item = CrawlItem(index=index, url=url, host=host)
+            st = self._hosts.get(host)
+            if self._saturated(st):
+                st.parked.append(item)
+                self._parked += 1
+            else:
+                self._pending += 1
+                self._enqueue(item, self._now())
+            self._cond.notify_all()
+
+    async def close(self) -> None:
+        """
+        Signal that no more URLs will be added.
+        """
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    async def get(self) -> Optional[CrawlItem]:
+        """
+        Wait for a URL whose host may be fetched now. Returns None when all work is done.
+        """
+        async with self._cond:
+            while True:
+                now = self._now()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, item = heapq.heappop(self._delayed)
+                    self._enqueue(item, now)
+
+                while self._ready and self._ready[0][0] <= now:
+                    _, _, host = heapq.heappop(self._ready)
+                    st = self._hosts[host]
+                    st.scheduled = False
+                    if not st.queue or st.active >= self.max_conns_per_host:
+                        continue  # rescheduled by release()/_enqueue()
+                    wait = max(st.blocked_until - now, self._wait_for_token(st, now))
+                    if wait > 0:
+                        self._schedule(host, st, now + wait)
+                        continue
+                    if self.rate_per_host > 0:
+                        st.tokens -= 1.0
+                    item = st.queue.popleft()
+                    st.active += 1
+                    self._inflight += 1
+                    if st.parked:
+                        st.queue.append(st.parked.popleft())  # takes over the dequeued item's slot
+                        self._parked -= 1
+                    else:
+                        self._pending -= 1
+                    if st.queue and st.active < self.max_conns_per_host:
+                        self._schedule(host, st, now)
+                    self._cond.notify_all()
+                    return item
+
+                if self._closed and self._pending == 0 and self._parked == 0 and self._inflight == 0:
+                    self._cond.notify_all()
+                    return None
+
+                due = [h[0][0] for h in (self._ready, self._delayed) if h]
+                timeout = max(0.0, min(due) - now) if due else None
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(
+        self,
+        item: CrawlItem,
+        retry_in: Optional[float] = None,
+        host_blocked_for: Optional[float] = None,
+    ) -> None:
+        """
+        Mark a fetch finished. retry_in re-queues the URL after a delay;
+        host_blocked_for pauses the whole host (Retry-After / 429).
+        """
+        async with self._cond:
+            now = self._now()
+            st = self._hosts[item.host]
+            st.active -= 1
+            self._inflight -= 1
+            if host_blocked_for is not None:
+                st.blocked_until = max(st.blocked_until, now + host_blocked_for)
+            if retry_in is not None:
+                self._pending += 1
+                heapq.heappush(
+                    self._delayed,
+                    (now + retry_in, next(self._seq), CrawlItem(item.index, item.url, item.host, item.attempt + 1)),
+                )
+            if st.queue:
+                self._schedule(item.host, st, now)
+            self._cond.notify_all()
@@ -1,8 +1,31 @@
 from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 import re
 import httpx
 
+from atlas.store.http_cache import CacheEntry, conditional_headers
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    ok: bool
+    path: Optional[Path]
+    status_code: Optional[int]
+    bytes_written: int = 0
+    skipped: bool = False
+    not_modified: bool = False  # 304, or body hash matches the cached one
+    error: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
 
 def _safe_filename_from_url(url: str) -> str:
     # Keep it simple and safe
@@ -13,10 +36,16 @@ def _safe_filename_from_url(url: str) -> str:
     return name[:180]
 
 
-def download_pdf(url: str, out_dir: Path, timeout_s: int = 30) -> Path:
+def _part_path(out_path: Path) -> Path:
+    # Unique per download, so two URLs that map to one filename never share a temp file
+    return out_path.with_name(f"{out_path.name}.{uuid.uuid4().hex[:12]}.part")
+
+
+def download_pdf(url: str, out_dir: Path, timeout_s: int = 30, chunk_size: int = 1 << 16) -> Path:
     """
     Download a PDF from URL into out_dir. Returns local file path.
-    Skips download if file already exists.
+    Skips download if file already exists. The body is streamed to a .part
+    file and renamed on completion, so memory stays flat for large PDFs.
     """
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / _safe_filename_from_url(url)
@@ -24,15 +53,124 @@ def download_pdf(url: str, out_dir: Path, timeout_s: int = 30) -> Path:
     if out_path.exists() and out_path.stat().st_size > 0:
         return out_path
 
+    tmp_path = _part_path(out_path)
     with httpx.Client(follow_redirects=True, timeout=timeout_s) as client:
-        r = client.get(url)
-        r.raise_for_status()
+        with client.stream("GET", url) as r:
+            r.raise_for_status()
+            # No content-type check — many servers mislabel PDFs
+            try:
+                with tmp_path.open("wb") as f:
+                    for block in r.iter_bytes(chunk_size):
+                        f.write(block)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
 
-        # Basic content-type check (not strict)
-        if "pdf" not in (r.headers.get("content-type") or "").lower():
-            # Still write — many servers mislabel
-            pass
+    os.replace(tmp_path, out_path)
+    return out_path
 
-        out_path.write_bytes(r.content)
 
-    return out_path
+async def _download_one(
+    client: httpx.AsyncClient,
+    url: str,
+    out_dir: Path,
+    chunk_size: int,
+    cache: Optional[Dict[str, CacheEntry]] = None,
+) -> DownloadResult:
+    out_path = out_dir / _safe_filename_from_url(url)
+    exists = out_path.exists() and out_path.stat().st_size > 0
+    cached = cache.get(url) if cache is not None else None
+    if exists and cache is None:
+        return DownloadResult(url=url, ok=True, path=out_path, status_code=None, skipped=True)
+
+    # Validators only make sense if we still have the file they describe
+    headers = conditional_headers(cached) if exists else {}
+    tmp_path = _part_path(out_path)
+    written = 0
+    hasher = hashlib.sha256()
+    try:
+        async with client.stream("GET", url, headers=headers) as r:
+            status = r.status_code
+            etag = r.headers.get("etag")
+            last_modified = r.headers.get("last-modified")
+            if status == 304 and cached is not None:
+                return DownloadResult(
+                    url=url, ok=True, path=out_path, status_code=status, not_modified=True,
+                    etag=etag or cached.etag,
+                    last_modified=last_modified or cached.last_modified,
+                    content_hash=cached.content_hash,
+                )
+            if status >= 400:
+                return DownloadResult(url=url, ok=False, path=None, status_code=status, error=f"HTTP {status}")
+            with tmp_path.open("wb") as f:
+                async for block in r.aiter_bytes(chunk_size):
+                    f.write(block)
+                    hasher.update(block)
+                    written += len(block)
+        content_hash = hasher.hexdigest()
+        if exists and cached is not None and cached.content_hash == content_hash:
+            # Server ignored the validators but the body is unchanged
+            tmp_path.unlink(missing_ok=True)
+            return DownloadResult(
+                url=url, ok=True, path=out_path, status_code=status, bytes_written=written,
+                not_modified=True, etag=etag, last_modified=last_modified, content_hash=content_hash,
+            )
+        os.replace(tmp_path, out_path)
+        return DownloadResult(
+            url=url, ok=True, path=out_path, status_code=status, bytes_written=written,
+            etag=etag, last_modified=last_modified, content_hash=content_hash,
+        )
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        return DownloadResult(url=url, ok=False, path=None, status_code=None, error=str(e) or type(e).__name__)
+
+
+async def download_pdfs(
+    urls: Iterable[str],
+    out_dir: Path,
+    concurrency: int = 16,
+    timeout_s: int = 30,
+    chunk_size: int = 1 << 16,
+    user_agent: str = "AtlasIngest/1.0",
+    cache: Optional[Dict[str, CacheEntry]] = None,
+) -> List[DownloadResult]:
+    """
+    Download many PDFs concurrently over one pooled client.
+    Returns one DownloadResult per URL, in input order.
+    Without a cache, existing files are skipped. With a cache, existing files
+    are revalidated with conditional requests and replaced only if changed.
+
+    A fixed set of `concurrency` workers reads URLs from a queue, so the
+    number of tasks does not grow with the URL list. A URL listed more than
+    once is downloaded once and its result repeated.
+    """
+    url_list = [u.strip() for u in urls if u and u.strip() and not u.strip().startswith("#")]
+    unique = list(dict.fromkeys(url_list))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        timeout=timeout_s,
+        follow_redirects=True,
+        limits=limits,
+        headers={"User-Agent": user_agent},
+    ) as client:
+        queue: asyncio.Queue = asyncio.Queue()
+        for u in unique:
+            queue.put_nowait(u)
+        results: Dict[str, DownloadResult] = {}
+
+        async def work() -> None:
+            while not queue.empty():
+                u = queue.get_nowait()
+                results[u] = await _download_one(client, u, out_dir, chunk_size=chunk_size, cache=cache)
+
+        tasks = [asyncio.create_task(work()) for _ in range(max(1, min(concurrency, len(unique))))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return [results[u] for u in url_list]
@@ -0,0 +1,101 @@
+from __future__ import annotations
+import posixpath
+import re
+from typing import Iterable, Iterator
+from urllib.parse import quote, unquote_plus, urlsplit, urlunsplit
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that identify the click, not the content
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "gclsrc", "dclid", "msclkid", "yclid", "igshid", "twclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "spm",
+}
+_TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+
+def _is_tracking_param(name: str) -> bool:
+    n = name.lower()
+    return n in _TRACKING_PARAMS or n.startswith(_TRACKING_PREFIXES)
+
+
+_ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _normalize_escapes(s: str, safe: str) -> str:
+    # Percent-encode what must be, then decode escapes of unreserved characters
+    # (%7E -> ~) and uppercase the rest; reserved escapes such as %2F keep their meaning
+    s = quote(s, safe=safe + "%")
+
+    def fix(m: re.Match) -> str:
+        ch = chr(int(m.group(1), 16))
+        return ch if ch in _UNRESERVED else "%" + m.group(1).upper()
+
+    return _ESCAPE.sub(fix, s)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so trivially different spellings compare equal:
+    lowercase scheme/host, drop default ports, fragment and tracking params,
+    resolve dot segments, spell escapes one way, sort the remaining query.
+    Userinfo, IPv6 brackets, reserved escapes (%2F) and bare query keys are
+    kept. A URL that does not parse (e.g. a non-numeric port) is returned as is.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    else:
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    host = host.lower()
+    userinfo = parts.netloc.rpartition("@")[0]
+    netloc = host if port is None or _DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    if "." in path:
+        trailing = path.endswith("/")
+        path = posixpath.normpath(path)
+        if not path.startswith("/"):
+            path = "/" + path
+        if path.startswith("//"):
+            path = "/" + path.lstrip("/")
+        if trailing and path != "/":
+            path += "/"
+    path = _normalize_escapes(path, safe="/:@!$&'()*+,;=-._~")
+
+    # Parameters are kept as written (a bare "q" stays "q"), only re-escaped and sorted
+    params = [
+        _normalize_escapes(param, safe="/?:@!$'()*+,;=-._~")
+        for param in parts.query.split("&")
+        if param and not _is_tracking_param(unquote_plus(param.partition("=")[0]))
+    ]
+    query = "&".join(sorted(params, key=lambda param: param.partition("=")))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def unique_urls(urls: Iterable[str]) -> Iterator[str]:
+    """
+    Yield URLs in order, skipping any whose canonical form was already seen.
+    The first spelling is kept, so source URIs stay as the user wrote them.
+    """
+    seen = set()
+    for u in urls:
+        key = canonicalize_url(u)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield u
@@ -1,9 +1,14 @@
 from __future__ import annotations
 import asyncio
+import hashlib
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Tuple
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import httpx
 
+from atlas.acquire.content_sniff import SNIFF_BYTES, sniff_content_kind
+from atlas.acquire.host_scheduler import HostScheduler, backoff_delay, parse_retry_after
+from atlas.store.http_cache import CacheEntry, conditional_headers
+
 
 @dataclass
 class CrawlResult:
@@ -12,45 +17,148 @@ class CrawlResult:
     status_code: Optional[int]
     html: str
     error: Optional[str] = None
+    not_modified: bool = False  # 304, or body hash matches the cached one
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    content_type: Optional[str] = None  # Content-Type header as sent
+    content_kind: Optional[str] = None  # sniffed: "html", "text", "pdf" or "binary"
+    skip_reason: Optional[str] = None  # "too_large", "binary" or "pdf" when the body was not kept
+    body: bytes = b""  # raw bytes behind html, as received
+    final_url: Optional[str] = None  # URL the body came from, after redirects
+    encoding: Optional[str] = None  # charset html was decoded with
+
+
+# Statuses that mean "slow down / try later" rather than a hard failure
+_THROTTLE_STATUSES = {429, 503}
 
 
 async def _fetch_one(
     client: httpx.AsyncClient,
     url: str,
-    retries: int,
-    delay_s: float,
-) -> CrawlResult:
-    last_err = None
-    for attempt in range(retries + 1):
-        try:
-            if delay_s > 0:
-                await asyncio.sleep(delay_s)
+    cached: Optional[CacheEntry] = None,
+    max_bytes: int = 10_000_000,
+) -> Tuple[CrawlResult, bool, Optional[float]]:
+    """
+    Single fetch attempt. Returns (result, retryable, retry_after_s).
+    Retries and politeness delays are the scheduler's job, not this function's.
 
-            r = await client.get(url)
+    The body is streamed: the first SNIFF_BYTES decide whether it is HTML/text
+    at all, and reading stops as soon as it is a PDF, binary, or over max_bytes.
+    """
+    headers = conditional_headers(cached)
+    try:
+        async with client.stream("GET", url, headers=headers) as r:
             status = r.status_code
+            etag = r.headers.get("etag")
+            last_modified = r.headers.get("last-modified")
+            ctype = r.headers.get("content-type")
+            if status == 304 and cached is not None:
+                return CrawlResult(
+                    url=url, ok=True, status_code=status, html="", not_modified=True,
+                    etag=etag or cached.etag,
+                    last_modified=last_modified or cached.last_modified,
+                    content_hash=cached.content_hash,
+                    content_type=ctype,
+                ), False, None
+            if status in _THROTTLE_STATUSES:
+                result = CrawlResult(url=url, ok=False, status_code=status, html="", error=f"HTTP {status}")
+                return result, True, parse_retry_after(r.headers.get("retry-after"))
             if status >= 400:
-                return CrawlResult(url=url, ok=False, status_code=status, html="", error=f"HTTP {status}")
-            html = r.text
-            return CrawlResult(url=url, ok=True, status_code=status, html=html)
-        except Exception as e:
-            last_err = str(e)
-            # small backoff
-            await asyncio.sleep(min(1.5 * (attempt + 1), 5.0))
-    return CrawlResult(url=url, ok=False, status_code=None, html="", error=last_err)
+                return CrawlResult(url=url, ok=False, status_code=status, html="", error=f"HTTP {status}"), False, None
 
+            def rejected(kind: Optional[str], reason: str, error: str) -> CrawlResult:
+                return CrawlResult(
+                    url=url, ok=False, status_code=status, html="", error=error,
+                    content_type=ctype, content_kind=kind, skip_reason=reason,
+                )
 
-async def crawl_urls(
-    urls: Iterable[str],
+            clen = r.headers.get("content-length", "")
+            if clen.isdigit() and int(clen) > max_bytes:
+                kind = "pdf" if "pdf" in (ctype or "").lower() else None
+                reason = "pdf" if kind == "pdf" else "too_large"
+                return rejected(kind, reason, f"Content-Length {clen} exceeds {max_bytes} bytes"), False, None
+
+            buf = bytearray()
+            kind = None
+            async for block in r.aiter_bytes():
+                buf += block
+                if kind is None and len(buf) >= SNIFF_BYTES:
+                    kind = sniff_content_kind(ctype, bytes(buf[:SNIFF_BYTES]))
+                    if kind in ("pdf", "binary"):
+                        return rejected(kind, kind, f"non-HTML payload ({kind})"), False, None
+                if len(buf) > max_bytes:
+                    return rejected(kind, "too_large", f"body exceeds {max_bytes} bytes"), False, None
+            if kind is None:
+                kind = sniff_content_kind(ctype, bytes(buf[:SNIFF_BYTES]))
+                if kind in ("pdf", "binary"):
+                    return rejected(kind, kind, f"non-HTML payload ({kind})"), False, None
+            body = bytes(buf)
+            encoding = r.encoding or "utf-8"
+            final_url = str(r.url)
+
+        content_hash = hashlib.sha256(body).hexdigest()
+        if cached is not None and cached.content_hash == content_hash:
+            # Server ignored the validators but the body is unchanged
+            return CrawlResult(
+                url=url, ok=True, status_code=status, html="", not_modified=True,
+                etag=etag, last_modified=last_modified, content_hash=content_hash,
+                content_type=ctype, content_kind=kind,
+            ), False, None
+        html = body.decode(encoding, errors="replace")
+        return CrawlResult(
+            url=url, ok=True, status_code=status, html=html,
+            etag=etag, last_modified=last_modified, content_hash=content_hash,
+            content_type=ctype, content_kind=kind, body=body, encoding=encoding, final_url=final_url,
+        ), False, None
+    except Exception as e:
+        return CrawlResult(url=url, ok=False, status_code=None, html="", error=str(e) or type(e).__name__), True, None
+
+
+def _clean_urls(urls: Iterable[str]) -> Iterator[str]:
+    for u in urls:
+        if u and u.strip() and not u.strip().startswith("#"):
+            yield u.strip()
+
+
+async def iter_crawl_indexed(
+    urls: Union[Iterable[str], AsyncIterable[str]],
     concurrency: int = 40,
     timeout_s: int = 25,
     retries: int = 2,
-    delay_s: float = 0.0,
     user_agent: str = "AtlasIngest/1.0",
-) -> List[CrawlResult]:
+    cache: Optional[Dict[str, CacheEntry]] = None,
+    queue_size: Optional[int] = None,
+    host_rate: float = 5.0,
+    host_burst: int = 10,
+    host_max_conns: int = 6,
+    backoff_base_s: float = 1.0,
+    backoff_max_s: float = 60.0,
+    max_bytes: int = 10_000_000,
+) -> AsyncIterator[Tuple[int, CrawlResult]]:
     """
-    Fetch many URLs concurrently. Returns list of CrawlResult.
+    Worker-pool crawl: a feeder pushes URLs into a bounded HostScheduler,
+    `concurrency` workers take whichever host is ready next, and results are
+    yielded (with their input index) as soon as each one completes. Memory is
+    bounded by the scheduler, the result queue and the in-flight fetches,
+    regardless of how many URLs the iterable produces. `urls` may also be an
+    async iterable (e.g. Frontier.urls()) that grows as pages are fetched.
+
+    Politeness is per host: host_rate requests/s (token bucket of host_burst),
+    at most host_max_conns connections, and 429/503 pause that host for
+    Retry-After (or an exponential backoff with jitter) while others proceed.
+
+    Bodies over max_bytes, and PDF/binary payloads, are not kept; see
+    CrawlResult.skip_reason (PDFs are reported so callers can route them).
     """
-    url_list = [u.strip() for u in urls if u and u.strip() and not u.strip().startswith("#")]
+    sched = HostScheduler(
+        rate_per_host=host_rate,
+        burst=host_burst,
+        max_conns_per_host=host_max_conns,
+        max_pending=queue_size or max(1000, concurrency * 20),
+    )
+    out_q: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    done = object()
     limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
 
     async with httpx.AsyncClient(
@@ -59,13 +167,106 @@ async def crawl_urls(
         limits=limits,
         headers={"User-Agent": user_agent},
     ) as client:
-        sem = asyncio.Semaphore(concurrency)
 
-        async def bound_fetch(u: str) -> CrawlResult:
-            async with sem:
-                return await _fetch_one(client, u, retries=retries, delay_s=delay_s)
+        async def feed() -> None:
+            try:
+                if isinstance(urls, AsyncIterable):
+                    idx = 0
+                    async for u in urls:
+                        if u and u.strip():
+                            await sched.put(idx, u.strip())
+                            idx += 1
+                else:
+                    for idx, u in enumerate(_clean_urls(urls)):
+                        await sched.put(idx, u)
+            finally:
+                await sched.close()
+
+        async def work() -> None:
+            while True:
+                item = await sched.get()
+                if item is None:
+                    await out_q.put(done)
+                    return
+                cached = cache.get(item.url) if cache is not None else None
+                r, retryable, retry_after = await _fetch_one(client, item.url, cached=cached, max_bytes=max_bytes)
+
+                host_block = None
+                if r.status_code in _THROTTLE_STATUSES:
+                    if retry_after is None:
+                        retry_after = backoff_delay(item.attempt, backoff_base_s, backoff_max_s)
+                    host_block = min(retry_after, backoff_max_s)
 
-        tasks = [asyncio.create_task(bound_fetch(u)) for u in url_list]
-        results = await asyncio.gather(*tasks)
+                if retryable and item.attempt < retries:
+                    retry_in = host_block if host_block is not None else backoff_delay(
+                        item.attempt, backoff_base_s, backoff_max_s
+                    )
+                    await sched.release(item, retry_in=retry_in, host_blocked_for=host_block)
+                    continue
 
-    return results
+                await sched.release(item, host_blocked_for=host_block)
+                await out_q.put((item.index, r))
+
+        tasks = [asyncio.create_task(feed())]
+        tasks += [asyncio.create_task(work()) for _ in range(concurrency)]
+        try:
+            finished = 0
+            while finished < concurrency:
+                item = await out_q.get()
+                if item is done:
+                    finished += 1
+                    continue
+                yield item
+            # Surface feeder errors (e.g. a failing URL iterable)
+            await tasks[0]
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def iter_crawl(
+    urls: Iterable[str],
+    concurrency: int = 40,
+    timeout_s: int = 25,
+    retries: int = 2,
+    user_agent: str = "AtlasIngest/1.0",
+    cache: Optional[Dict[str, CacheEntry]] = None,
+    queue_size: Optional[int] = None,
+    **crawl_opts: Any,
+) -> AsyncIterator[CrawlResult]:
+    """
+    Fetch many URLs concurrently, yielding each CrawlResult as it completes
+    (completion order, not input order). `urls` may be a lazy iterable; it is
+    consumed through a bounded queue so memory does not grow with list size.
+    Extra keyword arguments (politeness knobs, max_bytes) go to iter_crawl_indexed.
+    """
+    async for _, r in iter_crawl_indexed(
+        urls, concurrency, timeout_s, retries, user_agent, cache, queue_size, **crawl_opts
+    ):
+        yield r
+
+
+async def crawl_urls(
+    urls: Iterable[str],
+    concurrency: int = 40,
+    timeout_s: int = 25,
+    retries: int = 2,
+    user_agent: str = "AtlasIngest/1.0",
+    cache: Optional[Dict[str, CacheEntry]] = None,
+    **crawl_opts: Any,
+) -> List[CrawlResult]:
+    """
+    Fetch many URLs concurrently. Returns list of CrawlResult in input order.
+    If cache is given, requests are conditional on the stored validators and
+    unchanged pages come back with not_modified=True and an empty body.
+    Prefer iter_crawl for large URL lists.
+    """
+    indexed = [
+        item
+        async for item in iter_crawl_indexed(
+            urls, concurrency, timeout_s, retries, user_agent, cache, None, **crawl_opts
+        )
+    ]
+    indexed.sort(key=lambda item: item[0])
+    return [r for _, r in indexed]
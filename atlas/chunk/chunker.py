@@ -1,5 +1,13 @@
 from __future__ import annotations
-from typing import List
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+from atlas.chunk.tokens import TokenCounter
+
+
+CHUNK_MODES = ("words", "tokens")
 
 
 def chunk_words(text: str, chunk_size: int = 350, overlap: int = 50) -> List[str]:
@@ -20,3 +28,194 @@ def chunk_words(text: str, chunk_size: int = 350, overlap: int = 50) -> List[str
         i = max(0, j - overlap)
 
     return chunks
+
+
+_WORD = re.compile(r"\S+")  # same word boundaries as str.split()
+
+
+def word_spans(text: str) -> Iterator[Tuple[int, int]]:
+    return (m.span() for m in _WORD.finditer(text))
+
+
+def iter_chunk_spans(
+    words: Iterable[Tuple[int, int]],
+    chunk_size: int = 350,
+    overlap: int = 50,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Offset-based chunk_words: consumes (start, end) word spans lazily and
+    yields one (start_char, end_char) span per chunk, covering the same words
+    as chunk_words. Nothing is copied; slice the source text to materialize a
+    chunk (whitespace inside it is kept). Holds at most chunk_size + 1 spans.
+    """
+    buf: Deque[Tuple[int, int]] = deque()
+    step = max(0, chunk_size - overlap)
+    for span in words:
+        buf.append(span)
+        if len(buf) > chunk_size:
+            yield buf[0][0], buf[chunk_size - 1][1]
+            for _ in range(step):
+                buf.popleft()
+    if buf:
+        yield buf[0][0], buf[-1][1]
+
+
+def chunk_spans(text: str, chunk_size: int = 350, overlap: int = 50) -> List[Tuple[int, int]]:
+    return list(iter_chunk_spans(word_spans(text), chunk_size, overlap))
+
+
+# A sentence ends at . ! ? (plus closing quotes/brackets) before whitespace, after
+# CJK full stops, and at blank lines. Abbreviations split early, which only makes
+# packing a little finer.
+_SENTENCE_BREAK = re.compile(r"([.!?][\"'\u2019\u201d)\]]*)\s+|(?<=[\u3002\uff01\uff1f])(?=\S)|\n[ \t]*\n\s*")
+
+
+def sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    (start, end) of each sentence, without surrounding whitespace.
+    """
+    pos = 0
+    for m in _SENTENCE_BREAK.finditer(text):
+        end = m.end(1) if m.lastindex == 1 else m.start()
+        if end > pos:
+            yield pos, end
+        pos = m.end()
+    end = len(text.rstrip())
+    if end > pos:
+        yield pos, end
+
+
+def _spans_with_gaps(text: str, spans: List[Tuple[int, int]], end: int, tail: str) -> List[str]:
+    # Each span's text plus the whitespace up to the next span (tail after the last),
+    # so counts also cover the newlines a chunk keeps between its sentences or words
+    starts = [s for s, _ in spans[1:]] + [end]
+    out = [text[s:nxt] for (s, _), nxt in zip(spans, starts)]
+    if out:
+        out[-1] += tail
+    return out
+
+
+def token_units(
+    pieces: Iterable[Tuple[int, str]],
+    counter: TokenCounter,
+    max_tokens: int = 512,
+    sep: str = "\n\n",
+) -> Iterator[Tuple[int, int, int]]:
+    """
+    (start, end, tokens) per sentence of consecutive (offset, text) pieces,
+    such as pages joined by `sep`; sentences never cross pieces. Each
+    piece's sentences are counted in one batch, together with the
+    whitespace that follows them, so a chunk's token count is at most the
+    sum over its units. A sentence over max_tokens is cut into runs of
+    whole words that fit (a single word over budget stays whole).
+    """
+    for base, text in pieces:
+        spans = list(sentence_spans(text))
+        counts = counter.count_batch(_spans_with_gaps(text, spans, len(text), sep))
+        for k, ((s, e), n) in enumerate(zip(spans, counts)):
+            if n <= max_tokens:
+                yield base + s, base + e, n
+                continue
+            nxt = spans[k + 1][0] if k + 1 < len(spans) else len(text)
+            words = [(s + ws, s + we) for ws, we in word_spans(text[s:e])]
+            word_counts = counter.count_batch(_spans_with_gaps(text, words, nxt, sep if nxt == len(text) else ""))
+            run_start, run_end, run_n = -1, -1, 0
+            for (ws, we), wn in zip(words, word_counts):
+                if run_n and run_n + wn > max_tokens:
+                    yield base + run_start, base + run_end, run_n
+                    run_n = 0
+                if not run_n:
+                    run_start = ws
+                run_end, run_n = we, run_n + wn
+            if run_n:
+                yield base + run_start, base + run_end, run_n
+
+
+def iter_token_chunk_spans(
+    units: Iterable[Tuple[int, int, int]],
+    max_tokens: int = 512,
+    overlap_tokens: int = 64,
+) -> Iterator[Tuple[int, int, int]]:
+    """
+    Pack (start, end, tokens) units (see token_units) into chunks of at most
+    max_tokens, yielding (start_char, end_char, tokens). Each chunk repeats
+    the trailing sentences of the previous one that fit in overlap_tokens,
+    never all of them. Token totals are sums over units.
+    """
+    window: Deque[Tuple[int, int, int]] = deque()
+    total = 0
+    for unit in units:
+        n = unit[2]
+        if window and total + n > max_tokens:
+            yield window[0][0], window[-1][1], total
+            kept: Deque[Tuple[int, int, int]] = deque()
+            kept_n = 0
+            for u in reversed(window):
+                if len(kept) + 1 >= len(window) or kept_n + u[2] > overlap_tokens:
+                    break
+                kept.appendleft(u)
+                kept_n += u[2]
+            window, total = kept, kept_n
+            while window and total + n > max_tokens:
+                total -= window.popleft()[2]
+        window.append(unit)
+        total += n
+    if window:
+        yield window[0][0], window[-1][1], total
+
+
+class PagedText:
+    """
+    Text made of pages joined by blank lines and addressed by document-wide
+    character offsets. Pages are appended as they stream in and trim()
+    drops those that end before an offset, so only the pages under the
+    current chunk are held. pages() maps a span back to page numbers.
+    """
+
+    SEP = "\n\n"
+
+    def __init__(self, head_chars: int = 5000) -> None:
+        self._starts: List[int] = []
+        self._pages: List[int] = []
+        self._texts: List[str] = []
+        self.length = 0
+        self.head_chars = head_chars
+        self.head = ""  # first head_chars characters of the whole text
+
+    def append(self, page: int, text: str) -> Optional[int]:
+        """
+        Add a page; returns its start offset, or None for an empty page (skipped).
+        """
+        if not text:
+            return None
+        if self.length:
+            self.length += len(self.SEP)
+        start = self.length
+        self._starts.append(start)
+        self._pages.append(page)
+        self._texts.append(text)
+        self.length += len(text)
+        if len(self.head) < self.head_chars:
+            self.head = (self.head + self.SEP + text if self.head else text)[:self.head_chars]
+        return start
+
+    def _index(self, offset: int) -> int:
+        return bisect_right(self._starts, offset) - 1
+
+    def slice(self, start: int, end: int) -> str:
+        i, j = self._index(start), self._index(end - 1)
+        parts = []
+        for k in range(i, j + 1):
+            base = self._starts[k]
+            parts.append(self._texts[k][max(0, start - base):end - base])
+        return self.SEP.join(parts)
+
+    def pages(self, start: int, end: int) -> Tuple[int, int]:
+        return self._pages[self._index(start)], self._pages[self._index(end - 1)]
+
+    def trim(self, offset: int) -> None:
+        drop = 0
+        while drop < len(self._starts) and self._starts[drop] + len(self._texts[drop]) <= offset:
+            drop += 1
+        if drop:
+            del self._starts[:drop], self._pages[:drop], self._texts[:drop]
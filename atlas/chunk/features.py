@@ -0,0 +1,66 @@
+from __future__ import annotations
+import hashlib
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from atlas.chunk.tokens import get_tokenizer
+from atlas.clean.normalize import count_odd_chars
+from atlas.dedupe.simhash import simhash64_batch
+
+
+@dataclass
+class ChunkFeatures:
+    chunk_id: str
+    exact_hash: str
+    simhash64: int
+    gibberish_score: float  # rounded to 4 places, as stored
+    char_len: int
+    word_len: int
+    token_len: int
+
+
+def make_chunk_id(doc_id: str, chunk_text: str, chunk_index: int) -> str:
+    h = hashlib.sha256(
+        (doc_id + "|" + str(chunk_index) + "|" + chunk_text).encode("utf-8", errors="ignore")
+    ).hexdigest()
+    return "sha256:" + h
+
+
+def chunk_features(
+    doc_id: str,
+    texts: Sequence[str],
+    indices: Sequence[int],
+    tokenizer: str = "regex",
+) -> List[ChunkFeatures]:
+    """
+    All per-chunk features for one document's chunks in one call: chunk_id,
+    SHA-256, 64-bit SimHash, gibberish score and lengths (characters, words,
+    tokens). Values match make_chunk_id / sha256_text / simhash64 /
+    gibberish_score.
+
+    Each text is encoded to UTF-8 once and the bytes feed both hashes;
+    SimHashes are computed for the whole batch (simhash64_batch) and odd
+    characters are counted by one regex scan.
+    """
+    prefix = doc_id + "|"
+    # One batch for the document, past the memo: whole chunks rarely repeat
+    token_lens = get_tokenizer(tokenizer).tokenizer.count_batch(texts)
+    simhashes = simhash64_batch(texts)
+    out: List[ChunkFeatures] = []
+    for text, idx, token_len, simh in zip(texts, indices, token_lens, simhashes):
+        data = text.encode("utf-8", errors="ignore")
+        id_hash = hashlib.sha256((prefix + str(idx) + "|").encode("utf-8", errors="ignore"))
+        # chunk_id covers the first 4000 characters; reuse the full bytes when that is all of them
+        id_hash.update(data if len(text) <= 4000 else text[:4000].encode("utf-8", errors="ignore"))
+
+        char_len = len(text)
+        out.append(ChunkFeatures(
+            chunk_id="sha256:" + id_hash.hexdigest(),
+            exact_hash=hashlib.sha256(data).hexdigest(),
+            simhash64=simh,
+            gibberish_score=round(count_odd_chars(text) / max(1, char_len), 4) if text else 1.0,
+            char_len=char_len,
+            word_len=len(text.split()),
+            token_len=token_len,
+        ))
+    return out
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import Dict, List, Protocol, Sequence
+
+try:
+    import tiktoken  # optional: exact BPE counts for OpenAI-style encoders
+except ImportError:  # pragma: no cover
+    tiktoken = None
+
+
+TOKENIZERS = ("regex", "tiktoken")
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]: ...
+
+
+# ASCII letters, other letters, digits, newline runs, any other single character
+_PIECE = re.compile(r"([A-Za-z]+)|([^\W\d_]+)|(\d+)|(\n+)|[^\s]")
+
+
+class RegexTokenizer:
+    """
+    Offline approximation of BPE token counts (cl100k-like), no vocab needed.
+    Common English words are one token, long words one more per 6 letters,
+    digits go in groups of 3, non-ASCII letters one per 3 UTF-8 bytes (one
+    per CJK character) and punctuation one per character. It leans high on
+    rare words and accented text, which is the safe side for a hard limit.
+    """
+
+    name = "regex"
+
+    def count(self, text: str) -> int:
+        n = 0
+        for m in _PIECE.finditer(text):
+            g = m.lastindex
+            if g == 1:
+                n += 1 + max(0, len(m.group(1)) - 7) // 6
+            elif g == 2:
+                n += max(1, -(-len(m.group(2).encode("utf-8")) // 3))
+            elif g == 3:
+                n += -(-len(m.group(3)) // 3)
+            else:
+                n += 1
+        return n
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        return [self.count(t) for t in texts]
+
+
+class TiktokenTokenizer:
+    """
+    Exact counts from a tiktoken encoding. tiktoken fetches the BPE file on
+    first use unless it is already in TIKTOKEN_CACHE_DIR.
+    """
+
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = "cl100k_base") -> None:
+        if tiktoken is None:
+            raise RuntimeError("tokenizer 'tiktoken' needs the tiktoken package (pip install tiktoken)")
+        self.enc = tiktoken.get_encoding(encoding)
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        return [len(ids) for ids in self.enc.encode_ordinary_batch(list(texts))]
+
+
+class TokenCounter:
+    """
+    Batched, memoized counts on top of a Tokenizer. Only texts not seen
+    before go to the tokenizer, in one count_batch call; repeated sentences
+    (boilerplate, overlap) are counted once. The memo is dropped whole when
+    it reaches max_entries.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, max_entries: int = 1 << 16) -> None:
+        self.tokenizer = tokenizer
+        self.name = tokenizer.name
+        self.max_entries = max_entries
+        self._memo: Dict[str, int] = {}
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        memo = self._memo
+        missing = list(dict.fromkeys(t for t in texts if t not in memo))
+        if missing:
+            if len(memo) + len(missing) > self.max_entries:
+                memo.clear()
+                missing = list(dict.fromkeys(texts))
+            memo.update(zip(missing, self.tokenizer.count_batch(missing)))
+        return [memo[t] for t in texts]
+
+    def count(self, text: str) -> int:
+        return self.count_batch([text])[0]
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(name: str = "regex") -> TokenCounter:
+    """
+    Shared, memoized counter per process.
+    """
+    if name == "regex":
+        return TokenCounter(RegexTokenizer())
+    if name == "tiktoken":
+        return TokenCounter(TiktokenTokenizer())
+    raise ValueError(f"Unknown tokenizer: {name!r} (expected one of {', '.join(TOKENIZERS)})")
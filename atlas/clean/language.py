@@ -0,0 +1,238 @@
+from __future__ import annotations
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from concurrent.futures import Executor
+from functools import lru_cache
+from typing import Dict, List, Optional, Protocol, Sequence
+
+import numpy as np
+from langdetect import LangDetectException
+from langdetect.detector_factory import PROFILES_DIRECTORY, DetectorFactory
+from langdetect.utils.ngram import NGram
+
+
+UNKNOWN = "unknown"
+LANG_BACKENDS = ("langdetect", "ngram")
+
+
+class LangBackend(Protocol):
+    def detect(self, text: str) -> str: ...
+
+
+class LangdetectBackend:
+    """
+    langdetect on its own factory. langdetect samples n-grams at random, so
+    results only repeat across runs with a seed; seed=None leaves it unseeded.
+    """
+
+    def __init__(self, seed: Optional[int] = 0, max_chars: int = 2000) -> None:
+        self.factory = DetectorFactory()
+        self.factory.load_profile(PROFILES_DIRECTORY)
+        self.factory.seed = seed
+        self.max_chars = max_chars
+
+    def detect(self, text: str) -> str:
+        try:
+            d = self.factory.create()
+            d.append(text[:self.max_chars])
+            return d.detect()
+        except LangDetectException:
+            return UNKNOWN
+
+
+class _NormalizeTable(dict):
+    # str.translate table filled lazily from langdetect's per-character normalization
+    def __missing__(self, code: int) -> str:
+        ch = NGram.normalize(chr(code))
+        self[code] = ch
+        return ch
+
+
+def _ngram_counts(text: str, table: _NormalizeTable) -> Counter:
+    # 1-3 grams per word with space padding, as langdetect's NGram produces them
+    grams: Counter = Counter()
+    for w in text.translate(table).split():
+        if any(a.isupper() and b.isupper() for a, b in zip(w, w[1:])):
+            continue  # acronyms; langdetect skips these too
+        s = " " + w + " "
+        grams.update(w)
+        grams.update(s[i:i + 2] for i in range(len(s) - 1))
+        grams.update(s[i:i + 3] for i in range(len(s) - 2))
+    return grams
+
+
+# langdetect's smoothing: ALPHA_DEFAULT / BASE_FREQ
+_ALPHA = 0.5 / 10000
+_URL_OR_EMAIL = re.compile(r"https?://[-_.?&~;+=/#0-9A-Za-z]{1,2076}|[-_.0-9A-Za-z]{1,64}@[-_0-9A-Za-z]{1,255}[-_.0-9A-Za-z]{1,255}")
+
+
+class NgramBackend:
+    """
+    Offline naive Bayes classifier over langdetect's bundled n-gram profiles.
+    Scores every n-gram of the text once (no random sampling), so it is
+    deterministic and about twice as fast as langdetect; labels are the
+    same language codes.
+    """
+
+    def __init__(self, max_chars: int = 2000) -> None:
+        self.max_chars = max_chars
+        self.langs: List[str] = []
+        profiles = []
+        for name in sorted(os.listdir(PROFILES_DIRECTORY)):
+            with open(os.path.join(PROFILES_DIRECTORY, name), encoding="utf-8") as f:
+                prof = json.load(f)
+            self.langs.append(prof["name"])
+            profiles.append(prof)
+
+        self.index: Dict[str, int] = {}
+        for prof in profiles:
+            for g in prof["freq"]:
+                self.index.setdefault(g, len(self.index))
+
+        # log(P(gram | lang) + alpha), the per-gram weight langdetect uses. The constant
+        # alpha (not a per-language floor) keeps grams no profile knows well, such as
+        # names and numbers, from favouring languages with small training corpora.
+        n_words = np.array([p["n_words"] for p in profiles], dtype=np.float64)  # (langs, 3)
+        logp = np.full((len(self.index), len(profiles)), np.log(_ALPHA))
+        for li, prof in enumerate(profiles):
+            for g, c in prof["freq"].items():
+                logp[self.index[g], li] = np.log(c / n_words[li, min(len(g), 3) - 1] + _ALPHA)
+        self.logp = logp.astype(np.float32)
+        self.table = _NormalizeTable()
+
+    def detect(self, text: str) -> str:
+        counts = _ngram_counts(_URL_OR_EMAIL.sub(" ", text[:self.max_chars]), self.table)
+        rows = [(self.index[g], c) for g, c in counts.items() if g in self.index]
+        if not rows:
+            return UNKNOWN
+        idx = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        weights = np.fromiter((r[1] for r in rows), dtype=np.float32, count=len(rows))
+        return self.langs[int(np.argmax(weights @ self.logp[idx]))]
+
+
+@lru_cache(maxsize=None)
+def get_backend(name: str = "langdetect", seed: Optional[int] = 0) -> LangBackend:
+    """
+    Shared backend instance per process (profiles are loaded once).
+    """
+    if name == "langdetect":
+        return LangdetectBackend(seed=seed)
+    if name == "ngram":
+        return NgramBackend()
+    raise ValueError(f"Unknown language backend: {name!r} (expected one of {', '.join(LANG_BACKENDS)})")
+
+
+def _detect_one(backend: str, seed: Optional[int], text: str) -> str:
+    return get_backend(backend, seed).detect(text)
+
+
+def detect_languages(
+    texts: Sequence[str],
+    backend: str = "langdetect",
+    seed: Optional[int] = 0,
+    executor: Optional[Executor] = None,
+) -> List[str]:
+    """
+    Detect each text's language. With an executor (thread or process pool),
+    texts are spread over it; each worker process loads the backend once.
+    """
+    if executor is None or len(texts) < 2:
+        b = get_backend(backend, seed)
+        return [b.detect(t) for t in texts]
+    n = len(texts)
+    return list(executor.map(_detect_one, [backend] * n, [seed] * n, texts, chunksize=max(1, n // 32)))
+
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+
+@lru_cache(maxsize=1 << 14)
+def _script(ch: str) -> str:
+    return unicodedata.name(ch, "?").split(" ", 1)[0]
+
+
+def script_counts(text: str) -> Counter:
+    """
+    Letters per script ("LATIN", "CYRILLIC", "CJK", ...).
+    """
+    scripts: Counter = Counter()
+    for ch, c in Counter(text).items():
+        if ch.isalpha():
+            scripts[_script(ch)] += c
+    return scripts
+
+
+def profile_distance(a: Counter, b: Counter) -> float:
+    """
+    L1 distance between two count distributions (0 = same, 2 = disjoint).
+    """
+    ta, tb = sum(a.values()), sum(b.values())
+    if not ta or not tb:
+        return 0.0 if ta == tb else 2.0
+    return sum(abs(a.get(k, 0) / ta - b.get(k, 0) / tb) for k in a.keys() | b.keys())
+
+
+def _doc_sample(texts: Sequence[str], parts: int = 4, chars: int = 2000) -> str:
+    # Slices from chunks spread across the document, so one odd first chunk does not decide it
+    if not texts:
+        return ""
+    step = max(1, len(texts) // parts)
+    picked = list(texts[::step])[:parts]
+    per = max(1, chars // len(picked))
+    return "\n".join(t[:per] for t in picked)
+
+
+def detect_chunk_languages(
+    texts: Sequence[str],
+    backend: str = "langdetect",
+    seed: Optional[int] = 0,
+    max_script_shift: float = 0.3,
+    min_common_ratio: float = 0.4,
+    top_words: int = 50,
+    min_words: int = 20,
+    executor: Optional[Executor] = None,
+) -> List[str]:
+    """
+    Language per chunk of one document. The document is detected once, from
+    a sample across its chunks, and a chunk is detected on its own only when
+    it looks different from the document:
+    - its letters' script mix is more than max_script_shift (L1) away, or
+    - it has at least min_words words and the share of them among the
+      document's top_words most common words is under min_common_ratio of
+      the document-wide share (a passage in another language of the same
+      script shares almost none of the document's function words).
+    Other chunks get the document language.
+    """
+    if not texts:
+        return []
+    scripts = [script_counts(t) for t in texts]
+    words = [_WORD.findall(t.lower()) for t in texts]
+    doc_scripts: Counter = Counter()
+    doc_words: Counter = Counter()
+    for sc, ws in zip(scripts, words):
+        doc_scripts.update(sc)
+        doc_words.update(ws)
+    common = {w for w, _ in doc_words.most_common(top_words)}
+    total = sum(doc_words.values())
+    doc_share = sum(doc_words[w] for w in common) / total if total else 0.0
+
+    def looks_different(i: int) -> bool:
+        if profile_distance(scripts[i], doc_scripts) > max_script_shift:
+            return True
+        ws = words[i]
+        if len(ws) < min_words or not doc_share:
+            return False
+        return sum(w in common for w in ws) / len(ws) < min_common_ratio * doc_share
+
+    doc_lang = detect_languages([_doc_sample(texts)], backend, seed)[0]
+    langs = [doc_lang] * len(texts)
+
+    recheck = [i for i in range(len(texts)) if looks_different(i)]
+    if recheck:
+        found = detect_languages([texts[i] for i in recheck], backend, seed, executor)
+        for i, lang in zip(recheck, found):
+            langs[i] = lang
+    return langs
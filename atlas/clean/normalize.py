@@ -2,30 +2,67 @@ from __future__ import annotations
 import re
 
 
+# Control chars except newline/tab. A regex beats str.translate here: translate
+# falls off its fast path on non-ASCII text, which most extracted text is.
+_CONTROL_RUN = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]+")
+_HYPHEN_BREAK = re.compile(r"(\w)-\n(\w)")
+# Same result as [ \t]+ -> " " but leaves single spaces alone
+_SPACE_RUN = re.compile(r"[ \t]{2,}|\t")
+_BLANK_RUN = re.compile(r"\n{3,}")
+# Anything normalize_text would change, apart from leading/trailing whitespace
+_NEEDS_WORK = re.compile(r"[\x00-\x08\x0b-\x1f\x7f\t]|  |\n |\n\n\n|\w-\n\w")
+
+
+def is_normalized(text: str) -> bool:
+    """
+    True if normalize_text(text) == text, checked in one regex scan that
+    stops at the first offending character.
+    """
+    if not text:
+        return True
+    if text[0].isspace() or text[-1].isspace():
+        return False
+    return _NEEDS_WORK.search(text) is None
+
+
 def normalize_text(text: str) -> str:
     """
-    Clean/normalize text for chunking and indexing.
+    Clean/normalize text for chunking and indexing. Already-normalized input
+    (e.g. chunks cut from normalized text) is returned after a single scan.
     """
     if not text:
         return ""
-    t = text.replace("\r", "\n")
+    if is_normalized(text):
+        return text
+    t = text.replace("\r", "\n") if "\r" in text else text
 
     # Fix hyphenated line breaks: "inter-\nnet" -> "internet"
-    t = re.sub(r"(\w)-\n(\w)", r"\1\2", t)
+    if "-\n" in t:
+        t = _HYPHEN_BREAK.sub(r"\1\2", t)
 
-    # Normalize whitespace
-    t = re.sub(r"[ \t]+", " ", t)
-    t = re.sub(r"\n[ \t]+", "\n", t)
+    # Normalize whitespace; after the first pass a newline is followed by at most one space
+    t = _SPACE_RUN.sub(" ", t)
+    t = t.replace("\n ", "\n")
 
     # Collapse excessive blank lines
-    t = re.sub(r"\n{3,}", "\n\n", t)
+    if "\n\n\n" in t:
+        t = _BLANK_RUN.sub("\n\n", t)
 
     # Remove control chars (except newline/tab)
-    t = "".join(ch for ch in t if ch == "\n" or ch == "\t" or (ord(ch) >= 32 and ord(ch) != 127))
+    t = _CONTROL_RUN.sub("", t)
 
     return t.strip()
 
 
+# Characters gibberish_score counts against a text: not alphanumeric,
+# whitespace or common punctuation (\w also matches "_", which is odd)
+_ODD_CHAR = re.compile(r"[^\w\s.,;:'\"()\[\]\-]|_")
+
+
+def count_odd_chars(text: str) -> int:
+    return len(_ODD_CHAR.findall(text))
+
+
 def gibberish_score(text: str) -> float:
     """
     Simple extraction-quality heuristic: high non-alnum ratio often signals bad extraction.
@@ -33,10 +70,4 @@ def gibberish_score(text: str) -> float:
     """
     if not text:
         return 1.0
-    allowed = set(".,;:'\"()[]-")
-    non = 0
-    for c in text:
-        if c.isalnum() or c.isspace() or c in allowed:
-            continue
-        non += 1
-    return non / max(1, len(text))
+    return count_odd_chars(text) / max(1, len(text))
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Tuple, Dict
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Set, Tuple
 from collections import Counter
 
 
@@ -10,14 +11,91 @@ class PageText:
     text: str
 
 
-def _first_lines(text: str, n: int = 2) -> List[str]:
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    return lines[:n]
+_DIGIT_RUN = re.compile(r"\d+")
 
 
-def _last_lines(text: str, n: int = 2) -> List[str]:
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    return lines[-n:] if len(lines) >= n else lines
+def line_key(line: str) -> str:
+    """
+    Key a stripped line is counted under: digit runs collapse to "#", so
+    "Page 12 of 300" and "Page 13 of 300" are one repeated line.
+    """
+    return _DIGIT_RUN.sub("#", line)
+
+
+def _edge_lines(lines: List[str], n: int = 2) -> Tuple[List[str], List[str]]:
+    # First and last n non-empty lines (stripped) from one split of the page
+    nonempty = [s for s in (ln.strip() for ln in lines) if s]
+    return nonempty[:n], (nonempty[-n:] if len(nonempty) >= n else nonempty)
+
+
+@dataclass
+class RepeatedLines:
+    # Exact lines (at least 6 characters) removed wherever they occur on a page
+    exact: Set[str] = field(default_factory=set)
+    # line_key patterns with numbers ("Page # of #", "#"), removed only among a page's edge lines
+    numbered: Set[str] = field(default_factory=set)
+    lines_to_check: int = 2
+
+    def __bool__(self) -> bool:
+        return bool(self.exact or self.numbered)
+
+
+class RepeatedLineCounter:
+    """
+    First pass of header/footer detection: counts each page's first/last N
+    lines one page at a time, both exactly and by line_key, so pages need
+    not be held in memory. Feed every page with add(), then call repeated().
+    """
+
+    def __init__(self, lines_to_check: int = 2) -> None:
+        self.lines_to_check = lines_to_check
+        self.first: Counter = Counter()
+        self.last: Counter = Counter()
+        self.keys: Counter = Counter()
+        self.page_count = 0
+
+    def add(self, text: str) -> None:
+        first, last = _edge_lines(text.splitlines(), self.lines_to_check)
+        self.first.update(first)
+        self.last.update(last)
+        # A page counts once per pattern, so a header and footer that both carry numbers don't double up
+        self.keys.update({line_key(ln) for ln in first + last if any(c.isdigit() for c in ln)})
+        self.page_count += 1
+
+    def repeated(self, min_repeat_ratio: float = 0.6) -> RepeatedLines:
+        min_count = max(2, int(self.page_count * min_repeat_ratio))
+        exact = {ln for ln, c in self.first.items() if c >= min_count and len(ln) >= 6}
+        exact |= {ln for ln, c in self.last.items() if c >= min_count and len(ln) >= 6}
+        numbered = {k for k, c in self.keys.items() if c >= min_count}
+        return RepeatedLines(exact=exact, numbered=numbered, lines_to_check=self.lines_to_check)
+
+
+def strip_repeated_lines(text: str, repeated: RepeatedLines) -> str:
+    """
+    Second pass: drop lines found by RepeatedLineCounter from one page.
+    """
+    lines = text.splitlines()
+    if not repeated:
+        return "\n".join(lines).strip()
+
+    edge_idx: Set[int] = set()
+    if repeated.numbered:
+        nonempty = [i for i, ln in enumerate(lines) if ln.strip()]
+        n = repeated.lines_to_check
+        edge_idx = set(nonempty[:n]) | set(nonempty[-n:])
+
+    kept = []
+    for i, ln in enumerate(lines):
+        s = ln.strip()
+        if s in repeated.exact or (i in edge_idx and line_key(s) in repeated.numbered):
+            continue
+        kept.append(ln)
+    return "\n".join(kept).strip()
+
+
+def filter_pages(pages: Iterable[PageText], repeated: RepeatedLines) -> Iterator[PageText]:
+    for p in pages:
+        yield PageText(page=p.page, text=strip_repeated_lines(p.text, repeated))
 
 
 def remove_repeated_headers_footers(
@@ -27,36 +105,16 @@ def remove_repeated_headers_footers(
 ) -> List[PageText]:
     """
     Heuristic header/footer removal:
-    - Detect lines that repeat across many pages in the first/last N lines.
+    - Detect lines that repeat across many pages in the first/last N lines,
+      treating lines that differ only in their numbers as the same line.
     - Remove those lines from each page.
+    For pages that do not fit in memory, use RepeatedLineCounter and
+    filter_pages over two passes instead.
     """
     if not pages:
         return pages
 
-    first_counter = Counter()
-    last_counter = Counter()
-
-    for p in pages:
-        for ln in _first_lines(p.text, lines_to_check):
-            first_counter[ln] += 1
-        for ln in _last_lines(p.text, lines_to_check):
-            last_counter[ln] += 1
-
-    page_count = len(pages)
-    min_count = max(2, int(page_count * min_repeat_ratio))
-
-    repeated_first = {ln for ln, c in first_counter.items() if c >= min_count and len(ln) >= 6}
-    repeated_last = {ln for ln, c in last_counter.items() if c >= min_count and len(ln) >= 6}
-
-    cleaned: List[PageText] = []
+    counter = RepeatedLineCounter(lines_to_check)
     for p in pages:
-        lines = p.text.splitlines()
-        new_lines = []
-        for ln in lines:
-            s = ln.strip()
-            if s in repeated_first or s in repeated_last:
-                continue
-            new_lines.append(ln)
-        cleaned.append(PageText(page=p.page, text="\n".join(new_lines).strip()))
-
-    return cleaned
+        counter.add(p.text)
+    return list(filter_pages(pages, counter.repeated(min_repeat_ratio)))
@@ -1,32 +1,74 @@
 # atlas/cli.py
 import asyncio
 import hashlib
+import itertools
+import tempfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
 
 import typer
-from langdetect import LangDetectException, detect
 from rich import print
-from rich.progress import track
-
-from atlas.acquire.pdf_downloader import download_pdf
-from atlas.acquire.web_crawler import crawl_urls
-from atlas.chunk.chunker import chunk_words
-from atlas.clean.normalize import gibberish_score, normalize_text
-from atlas.clean.pdf_header_footer import PageText, remove_repeated_headers_footers
+from rich.progress import Progress, track
+
+from atlas.acquire.pdf_downloader import download_pdfs
+from atlas.acquire.frontier import Frontier
+from atlas.acquire.url_canon import unique_urls
+from atlas.acquire.web_crawler import iter_crawl_indexed
+from atlas.chunk.chunker import (
+    CHUNK_MODES,
+    PagedText,
+    iter_chunk_spans,
+    iter_token_chunk_spans,
+    token_units,
+    word_spans,
+)
+from atlas.chunk.features import chunk_features
+from atlas.chunk.tokens import TOKENIZERS, get_tokenizer
+from atlas.clean.language import LANG_BACKENDS, detect_chunk_languages
+from atlas.clean.normalize import normalize_text
+from atlas.clean.pdf_header_footer import RepeatedLineCounter, RepeatedLines, strip_repeated_lines
 from atlas.config import AtlasConfig
-from atlas.dedupe.exact import dedupe_exact, sha256_text
-from atlas.dedupe.simhash import dedupe_near_simhash, simhash64
-from atlas.extract.pdf_extract import PDFExtractResult, extract_pdf
-from atlas.extract.web_extract import extract_main_text
+from atlas.dedupe.documents import DocDeduper, DocFingerprint, DocFingerprinter, doc_fingerprint
+from atlas.dedupe.exact import dedupe_exact
+from atlas.dedupe.minhash import NEAR_DUP_METHODS, dedupe_near_minhash
+from atlas.dedupe.simhash import dedupe_near_simhash
+from atlas.extract.pdf_extract import (
+    PDFPageText,
+    PageSpool,
+    assemble_pdf_result,
+    extract_page_range,
+    extraction_cache_key,
+    is_extraction_cached,
+    iter_pdf_pages,
+    load_cached_pages,
+    page_ranges,
+    pdf_page_count,
+    store_cached_extraction,
+    store_cached_pages,
+    summarize_engines,
+)
+from atlas.extract.web_extract import EXTRACT_MODES, extract_main_text
 from atlas.store.jsonl_writer import read_jsonl, write_jsonl
-from atlas.store.metadata_sqlite import init_db, insert_chunks, upsert_doc
+from atlas.store.capture_store import CaptureEntry, CaptureStore
+from atlas.store.extract_cache import file_sha256, init_extract_cache
+from atlas.store.http_cache import CacheEntry, init_http_cache, load_cache_entries, save_cache_entries
+from atlas.store.dedupe_index import (
+    add_to_dedupe_index,
+    index_threshold,
+    init_dedupe_index,
+    near_seen,
+    seen_exact_hashes,
+)
+from atlas.store.metadata_sqlite import init_db, insert_chunks, load_chunk_hashes, upsert_doc
 from atlas.store.opensearch_index import index_chunks
 
 from atlas.eval.extraction_eval import run_extraction_eval
 from atlas.eval.web_eval import run_web_eval
 from atlas.eval.retrieval_eval import run_retrieval_eval
+from atlas.eval.near_dup_bench import run_near_dup_bench
 from atlas.dataset.build_citation_qa import build_citation_qa_dataset
 
 app = typer.Typer(add_completion=False)
@@ -36,25 +78,11 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 
-def safe_lang(text: str) -> str:
-    try:
-        return detect(text[:2000])
-    except LangDetectException:
-        return "unknown"
-
-
 def make_doc_id(source_uri: str, text_sample: str) -> str:
     h = hashlib.sha256((source_uri + "|" + text_sample).encode("utf-8", errors="ignore")).hexdigest()
     return "sha256:" + h
 
 
-def make_chunk_id(doc_id: str, chunk_text: str, chunk_index: int) -> str:
-    h = hashlib.sha256(
-        (doc_id + "|" + str(chunk_index) + "|" + chunk_text).encode("utf-8", errors="ignore")
-    ).hexdigest()
-    return "sha256:" + h
-
-
 def load_lines(p: Path) -> List[str]:
     if not p:
         return []
@@ -65,171 +93,880 @@ def load_lines(p: Path) -> List[str]:
     ]
 
 
+def cache_entries_from_results(results: List[Any], updated_at: str) -> List[CacheEntry]:
+    """
+    Turn crawl/download results into validator cache rows (successful fetches only).
+    """
+    return [
+        CacheEntry(
+            url=r.url,
+            etag=r.etag,
+            last_modified=r.last_modified,
+            content_hash=r.content_hash,
+            updated_at=updated_at,
+        )
+        for r in results
+        if r.ok and r.content_hash
+    ]
+
+
+def sqlite_row_from_chunk(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flatten a chunks.jsonl row into the shape insert_chunks expects.
+    """
+    return {
+        "chunk_id": row["chunk_id"],
+        "doc_id": row["doc_id"],
+        "chunk_index": row["chunk_index"],
+        "source_uri": row["source_uri"],
+        "page_start": row["page_start"],
+        "page_end": row["page_end"],
+        "exact_hash": row["dedupe"]["exact_hash"],
+        "simhash64": row["dedupe"]["simhash64"],
+        "char_len": row["quality"]["char_len"],
+        "word_len": row["quality"]["word_len"],
+        "token_len": row["quality"]["token_len"],
+        "lang": row["quality"]["lang"],
+        "gibberish_score": row["quality"]["gibberish_score"],
+        "ingested_at": row["timestamps"]["ingested_at"],
+    }
+
+
+def build_chunk_rows(
+    doc_id: str,
+    source_type: str,
+    source_uri: str,
+    chunks: Iterable[tuple[str, Optional[int], Optional[int]]],
+    ingested_at: str,
+    cfg: AtlasConfig,
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    JSONL and SQLite rows for one document's (text, page_start, page_end)
+    chunks. chunk_index is the position in `chunks`, including chunks
+    dropped for being empty.
+    """
+    texts: List[str] = []
+    indices: List[int] = []
+    page_spans: List[tuple[Optional[int], Optional[int]]] = []
+    for idx, (ch, page_start, page_end) in enumerate(chunks):
+        ch = normalize_text(ch)
+        if ch:
+            texts.append(ch)
+            indices.append(idx)
+            page_spans.append((page_start, page_end))
+
+    jsonl_rows: List[Dict[str, Any]] = []
+    sqlite_rows: List[Dict[str, Any]] = []
+    langs = detect_chunk_languages(texts, backend=cfg.lang_backend, seed=cfg.lang_seed)
+    features = chunk_features(doc_id, texts, indices, tokenizer=cfg.tokenizer)
+    for ch, idx, (page_start, page_end), f, lang in zip(texts, indices, page_spans, features, langs):
+        row = {
+            "chunk_id": f.chunk_id,
+            "doc_id": doc_id,
+            "chunk_index": idx,
+            "source_type": source_type,
+            "source_uri": source_uri,
+            "page_start": page_start,
+            "page_end": page_end,
+            "text": ch,
+            "quality": {
+                "lang": lang,
+                "gibberish_score": f.gibberish_score,
+                "char_len": f.char_len,
+                "word_len": f.word_len,
+                "token_len": f.token_len,
+            },
+            "dedupe": {"exact_hash": f.exact_hash, "simhash64": f.simhash64},
+            "timestamps": {"ingested_at": ingested_at},
+        }
+        jsonl_rows.append(row)
+        sqlite_rows.append(sqlite_row_from_chunk(row))
+    return jsonl_rows, sqlite_rows
+
+
+def iter_doc_chunk_spans(pieces: Iterable[tuple[int, str]], cfg: AtlasConfig) -> Iterator[tuple[int, int]]:
+    """
+    (start, end) chunk spans over a document given as consecutive
+    (offset, text) pieces, sized by words or by tokens per cfg.chunk_mode.
+    """
+    if cfg.chunk_mode == "tokens":
+        units = token_units(pieces, get_tokenizer(cfg.tokenizer), max_tokens=cfg.chunk_tokens)
+        spans = iter_token_chunk_spans(units, max_tokens=cfg.chunk_tokens, overlap_tokens=cfg.chunk_overlap_tokens)
+        return ((start, end) for start, end, _ in spans)
+    words = ((base + s, base + e) for base, text in pieces for s, e in word_spans(text))
+    return iter_chunk_spans(words, chunk_size=cfg.chunk_words, overlap=cfg.chunk_overlap)
+
+
+def _spool_pdf_pages(
+    pdf_path: Path,
+    spool: PageSpool,
+    pages: Optional[Iterable[PDFPageText]] = None,
+    extract_cache_db: Optional[Path] = None,
+    sha256: Optional[str] = None,
+) -> tuple[str, RepeatedLines]:
+    # First pass: extracted (or cached) pages go to the spool compressed while
+    # header/footer candidates are counted. Returns (engine, repeated lines).
+    cache_key = None
+    if pages is None and extract_cache_db is not None:
+        cache_key, hit = load_cached_pages(pdf_path, extract_cache_db, sha256=sha256)
+        if hit is not None:
+            cache_key, pages = None, hit[1]
+            del hit
+    if pages is None:
+        pages = iter_pdf_pages(pdf_path)
+
+    counter = RepeatedLineCounter(lines_to_check=2)
+    engines: set[str] = set()
+    for p in pages:
+        counter.add(p.text)
+        engines.add(p.engine)
+        spool.append(p)
+    engine = summarize_engines(engines)
+    if cache_key is not None:
+        store_cached_pages(extract_cache_db, cache_key, engine, spool)
+    return engine, counter.repeated(min_repeat_ratio=0.6)
+
+
+def _clean_pages(spool: PageSpool, repeated: RepeatedLines) -> Iterator[PDFPageText]:
+    # Normalization never joins text across the blank line between pages, so
+    # normalized pages joined by blank lines are the normalized document
+    for p in spool:
+        yield PDFPageText(page=p.page, text=normalize_text(strip_repeated_lines(p.text, repeated)), engine=p.engine)
+
+
+def _chunk_pages(
+    pages: Iterable[PDFPageText],
+    cfg: AtlasConfig,
+) -> tuple[List[tuple[str, Optional[int], Optional[int]]], str]:
+    # (text, page_start, page_end) chunks of cleaned pages, and the document head for make_doc_id
+    doc = PagedText(head_chars=5000)
+
+    def pieces() -> Iterator[tuple[int, str]]:
+        for p in pages:
+            base = doc.append(p.page, p.text)
+            if base is not None:
+                yield base, p.text
+
+    chunks: List[tuple[str, Optional[int], Optional[int]]] = []
+    for start, end in iter_doc_chunk_spans(pieces(), cfg):
+        chunks.append((doc.slice(start, end), *doc.pages(start, end)))
+        doc.trim(start)  # later chunks start at or after this one
+    return chunks, doc.head
+
+
+def _pdf_doc_meta(doc_id: str, source_uri: str, page_count: int, engine: str, ingested_at: str) -> Dict[str, Any]:
+    return {
+        "doc_id": doc_id,
+        "source_type": "pdf",
+        "source_uri": source_uri,
+        "page_count": page_count,
+        "engine": engine,
+        "ingested_at": ingested_at,
+    }
+
+
+def prepare_pdf_doc(
+    pdf_path: Path,
+    ingested_at: str,
+    cleaned: PageSpool,
+    source_uri: Optional[str] = None,
+    pages: Optional[Iterable[PDFPageText]] = None,
+    extract_cache_db: Optional[Path] = None,
+    sha256: Optional[str] = None,
+) -> tuple[Dict[str, Any], DocFingerprint]:
+    """
+    Extract and clean one PDF without chunking it: non-empty cleaned pages
+    go to `cleaned`, and the document is fingerprinted on the way so a
+    duplicate can be dropped before chunk_cleaned_pdf runs.
+    """
+    source_uri = source_uri or str(pdf_path)
+    with PageSpool() as spool:
+        engine, repeated = _spool_pdf_pages(pdf_path, spool, pages, extract_cache_db, sha256)
+        pages = None  # a cached page list can be freed now
+        head = PagedText(head_chars=5000)
+        fingerprint = DocFingerprinter()
+        for p in _clean_pages(spool, repeated):
+            if head.append(p.page, p.text) is None:
+                continue
+            head.trim(head.length)  # only the head is needed
+            fingerprint.update(p.text)
+            cleaned.append(p)
+        doc_meta = _pdf_doc_meta(make_doc_id(source_uri, head.head), source_uri, len(spool), engine, ingested_at)
+    return doc_meta, fingerprint.fingerprint()
+
+
+def chunk_cleaned_pdf(
+    doc_meta: Dict[str, Any],
+    cleaned: Iterable[PDFPageText],
+    cfg: AtlasConfig,
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    JSONL and SQLite rows for a PDF from prepare_pdf_doc.
+    """
+    chunks, _ = _chunk_pages(cleaned, cfg)
+    return build_chunk_rows(
+        doc_meta["doc_id"], "pdf", doc_meta["source_uri"], chunks, doc_meta["ingested_at"], cfg
+    )
+
+
 def build_pdf_chunks(
     pdf_path: Path,
     cfg: AtlasConfig,
     ingested_at: str,
+    source_uri: Optional[str] = None,
+    pages: Optional[Iterable[PDFPageText]] = None,
+    extract_cache_db: Optional[Path] = None,
+    doc_dedupe: Optional[DocDeduper] = None,
+    sha256: Optional[str] = None,
 ) -> tuple[str, Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
-    result: PDFExtractResult = extract_pdf(pdf_path)
+    """
+    Extract, clean and chunk one PDF. Pages stream through: the first pass
+    counts header/footer candidates while spooling compressed pages, the
+    second cleans, normalizes and chunks page by page. Chunks are slices of
+    the normalized text between word (or sentence) offsets, so each one knows
+    the pages it spans; only the pages under the current chunk are held.
+
+    With doc_dedupe, cleaned pages are spooled and fingerprinted before any
+    chunking; a duplicate document comes back with "duplicate_of" set in its
+    doc_meta and no chunks.
+
+    sha256, when the file's hash is already known, keys the extract cache
+    instead of hashing the file.
+    """
+    source_uri = source_uri or str(pdf_path)
+    if doc_dedupe is not None:
+        with PageSpool() as cleaned:
+            doc_meta, fingerprint = prepare_pdf_doc(
+                pdf_path, ingested_at, cleaned, source_uri, pages, extract_cache_db, sha256
+            )
+            pages = None
+            duplicate_of = doc_dedupe.add(doc_meta["doc_id"], fingerprint)
+            if duplicate_of is not None:
+                return doc_meta["doc_id"], {**doc_meta, "duplicate_of": duplicate_of}, [], []
+            jsonl_rows, sqlite_rows = chunk_cleaned_pdf(doc_meta, cleaned, cfg)
+        return doc_meta["doc_id"], doc_meta, jsonl_rows, sqlite_rows
+
+    with PageSpool() as spool:
+        engine, repeated = _spool_pdf_pages(pdf_path, spool, pages, extract_cache_db, sha256)
+        pages = None  # a cached page list can be freed now
+        chunks, head = _chunk_pages(_clean_pages(spool, repeated), cfg)
+        doc_id = make_doc_id(source_uri, head)
+        doc_meta = _pdf_doc_meta(doc_id, source_uri, len(spool), engine, ingested_at)
+        jsonl_rows, sqlite_rows = build_chunk_rows(doc_id, "pdf", source_uri, chunks, ingested_at, cfg)
 
-    pages = [PageText(page=p.page, text=p.text) for p in result.pages]
-    pages_clean = remove_repeated_headers_footers(pages, min_repeat_ratio=0.6, lines_to_check=2)
+    return doc_id, doc_meta, jsonl_rows, sqlite_rows
 
-    combined = "\n\n".join(p.text for p in pages_clean)
-    combined = normalize_text(combined)
 
-    doc_id = make_doc_id(str(pdf_path), combined[:5000])
+def _pdf_chunk_job(
+    pdf_path: str,
+    cfg: AtlasConfig,
+    ingested_at: str,
+    pages: Optional[List[PDFPageText]] = None,
+    extract_cache_db: Optional[Path] = None,
+    source_uri: Optional[str] = None,
+    sha256: Optional[str] = None,
+) -> tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    # Runs in a worker process. SQLite rows are derived from the JSONL rows in
+    # the parent, so only one copy of each chunk is pickled back. `pages` is
+    # set when the file was extracted as page ranges by other workers.
+    path = Path(pdf_path)
+    pages = _assembled_pages(path, pages, extract_cache_db, sha256)
+    _, doc_meta, jsonl_rows, _ = build_pdf_chunks(
+        path, cfg, ingested_at, source_uri=source_uri, pages=pages, extract_cache_db=extract_cache_db, sha256=sha256
+    )
+    return doc_meta, jsonl_rows
+
+
+def _assembled_pages(
+    path: Path,
+    pages: Optional[List[PDFPageText]],
+    extract_cache_db: Optional[Path],
+    sha256: Optional[str] = None,
+) -> Optional[List[PDFPageText]]:
+    # Pages extracted as ranges by other workers, with per-page fallbacks applied and cached
+    if pages is None:
+        return None
+    result = assemble_pdf_result(path, pages)
+    if extract_cache_db is not None:
+        key = extraction_cache_key(sha256 or file_sha256(extract_cache_db, path))
+        store_cached_extraction(extract_cache_db, key, result)
+    return result.pages
+
+
+def _pdf_prepare_job(
+    pdf_path: str,
+    cfg: AtlasConfig,
+    ingested_at: str,
+    pages: Optional[List[PDFPageText]] = None,
+    extract_cache_db: Optional[Path] = None,
+    source_uri: Optional[str] = None,
+    sha256: Optional[str] = None,
+) -> tuple[Dict[str, Any], DocFingerprint, List[PDFPageText]]:
+    # Runs in a worker process: the first half of a _pdf_chunk_job under doc
+    # dedupe. The cleaned pages go back to the parent, which decides in file
+    # order whether the document is chunked (_pdf_chunk_cleaned_job) or dropped.
+    path = Path(pdf_path)
+    pages = _assembled_pages(path, pages, extract_cache_db, sha256)
+    with PageSpool() as cleaned:
+        doc_meta, fingerprint = prepare_pdf_doc(
+            path, ingested_at, cleaned, source_uri, pages, extract_cache_db, sha256
+        )
+        return doc_meta, fingerprint, list(cleaned)
+
+
+def _pdf_chunk_cleaned_job(
+    doc_meta: Dict[str, Any],
+    cleaned: List[PDFPageText],
+    cfg: AtlasConfig,
+) -> tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    # Runs in a worker process; see _pdf_prepare_job
+    jsonl_rows, _ = chunk_cleaned_pdf(doc_meta, cleaned, cfg)
+    return doc_meta, jsonl_rows
+
+
+def _split_ranges(p: Path, size: int, cfg: AtlasConfig) -> Optional[List[tuple[int, int]]]:
+    # Only files over the byte threshold are opened to count pages
+    if size < cfg.pdf_split_min_bytes:
+        return None
+    try:
+        n = pdf_page_count(p)
+    except Exception:
+        return None
+    if n < cfg.pdf_split_min_pages:
+        return None
+    return page_ranges(n, cfg.pdf_range_pages)
+
+
+def iter_pdf_chunks(
+    pdf_files: List[Path],
+    cfg: AtlasConfig,
+    ingested_at: str,
+    workers: int = 1,
+    extract_cache_db: Optional[Path] = None,
+    doc_dedupe: Optional[DocDeduper] = None,
+    source_uris: Optional[List[str]] = None,
+    sha256s: Optional[List[str]] = None,
+) -> Iterator[tuple[Path, Optional[tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]], Optional[Exception]]]:
+    """
+    Build chunks for many PDFs, yielding (path, (doc_meta, jsonl_rows, sqlite_rows), error)
+    in the order of pdf_files regardless of worker count.
+
+    With workers > 1, files go to a process pool largest-first, so a giant PDF
+    starts early instead of running alone at the end. Very long PDFs are also
+    split into page ranges extracted by several workers, then cleaned and
+    chunked as one document. Finished results are buffered until every
+    earlier file has been yielded. With extract_cache_db, cached page text is
+    reused and long files that hit the cache are not split.
+
+    With doc_dedupe, workers first extract and clean (_pdf_prepare_job); the
+    parent checks documents in file order, as the serial path does, and only
+    sends unique ones back to be chunked.
+
+    source_uris and sha256s, when given, run parallel to pdf_files: the URI
+    recorded for each document (default: its path) and a known content hash
+    that keys the extract cache instead of hashing the file.
+    """
+    source_uris = source_uris or [None] * len(pdf_files)
+    sha256s = sha256s or [None] * len(pdf_files)
+    if workers <= 1:
+        for i, p in enumerate(track(pdf_files, description="Processing PDFs")):
+            try:
+                _, doc_meta, jsonl_rows, sqlite_rows = build_pdf_chunks(
+                    p, cfg, ingested_at, source_uri=source_uris[i], extract_cache_db=extract_cache_db,
+                    doc_dedupe=doc_dedupe, sha256=sha256s[i],
+                )
+                yield p, (doc_meta, jsonl_rows, sqlite_rows), None
+            except Exception as e:
+                yield p, None, e
+        return
+
+    first_job = _pdf_chunk_job if doc_dedupe is None else _pdf_prepare_job
+    sizes = [p.stat().st_size if p.exists() else 0 for p in pdf_files]
+    order = sorted(range(len(pdf_files)), key=lambda i: sizes[i], reverse=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, Progress() as progress:
+        task = progress.add_task(f"Processing PDFs ({workers} workers)", total=len(pdf_files))
+        # future -> (file index, range index or None for a whole-file/chunking job)
+        pending: Dict[Future, tuple[int, Optional[int]]] = {}
+        range_parts: Dict[int, List[Optional[List[PDFPageText]]]] = {}
+        for i in order:
+            ranges = _split_ranges(pdf_files[i], sizes[i], cfg)
+            if ranges is not None and extract_cache_db is not None:
+                if is_extraction_cached(pdf_files[i], extract_cache_db, sha256=sha256s[i]):
+                    ranges = None  # already extracted; the whole-file job will hit the cache
+            if ranges is None:
+                fut = pool.submit(
+                    first_job, str(pdf_files[i]), cfg, ingested_at, None, extract_cache_db, source_uris[i], sha256s[i]
+                )
+                pending[fut] = (i, None)
+                continue
+            range_parts[i] = [None] * len(ranges)
+            for k, (start, end) in enumerate(ranges):
+                fut = pool.submit(extract_page_range, pdf_files[i], start, end)
+                pending[fut] = (i, k)
+
+        done: Dict[int, Any] = {}
+        next_i = 0
+        prepared: Dict[int, Future] = {}  # doc dedupe: files cleaned but not yet checked
+        chunking: set[int] = set()  # doc dedupe: files past the check, now being chunked
+        next_check = 0
+        while pending:
+            finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                i, k = pending.pop(fut)
+                if k is None and doc_dedupe is not None and i not in chunking:
+                    prepared[i] = fut
+                    continue
+                if k is None:
+                    done[i] = fut
+                    progress.advance(task)
+                    continue
+                parts = range_parts[i]
+                if parts is None:
+                    continue  # an earlier range of this file already failed
+                try:
+                    parts[k] = fut.result()
+                except Exception:
+                    range_parts[i] = None
+                    done[i] = fut
+                    progress.advance(task)
+                    continue
+                if all(part is not None for part in parts):
+                    pages = [pg for part in parts for pg in part]
+                    del range_parts[i]
+                    fut = pool.submit(
+                        first_job, str(pdf_files[i]), cfg, ingested_at, pages, extract_cache_db, source_uris[i], sha256s[i]
+                    )
+                    pending[fut] = (i, None)
+
+            # Doc dedupe: check cleaned files in file order; a file that failed
+            # before it was cleaned is already in done
+            while doc_dedupe is not None and (next_check in prepared or next_check in done):
+                i = next_check
+                next_check += 1
+                fut = prepared.pop(i, None)
+                if fut is None:
+                    continue
+                try:
+                    doc_meta, fingerprint, cleaned = fut.result()
+                except Exception:
+                    done[i] = fut
+                    progress.advance(task)
+                    continue
+                duplicate_of = doc_dedupe.add(doc_meta["doc_id"], fingerprint)
+                if duplicate_of is not None:
+                    done[i] = Future()
+                    done[i].set_result(({**doc_meta, "duplicate_of": duplicate_of}, []))
+                    progress.advance(task)
+                    continue
+                chunking.add(i)
+                pending[pool.submit(_pdf_chunk_cleaned_job, doc_meta, cleaned, cfg)] = (i, None)
+
+            while next_i in done:
+                f = done.pop(next_i)
+                p = pdf_files[next_i]
+                next_i += 1
+                try:
+                    doc_meta, jsonl_rows = f.result()
+                    yield p, (doc_meta, jsonl_rows, [sqlite_row_from_chunk(r) for r in jsonl_rows]), None
+                except Exception as e:
+                    yield p, None, e
+
+
+def prepare_web_doc(
+    url: str,
+    html: str,
+    cfg: AtlasConfig,
+    ingested_at: str,
+    content_kind: Optional[str] = None,
+) -> Optional[tuple[Dict[str, Any], str]]:
+    """
+    Extract and clean one page: (doc_meta, cleaned text), or None when no text is left.
+    """
+    ex = extract_main_text(
+        url,
+        html,
+        mode=cfg.web_extract_mode,
+        content_kind=content_kind,
+        min_chars=cfg.web_fast_min_chars,
+        max_link_density=cfg.web_fast_max_link_density,
+        min_visible_chars=cfg.web_min_visible_chars,
+    )
+    cleaned = normalize_text(ex.raw_text)
+    if not cleaned:
+        return None
+
+    doc_id = make_doc_id(ex.source_uri, cleaned[:5000])
 
     doc_meta = {
         "doc_id": doc_id,
-        "source_type": "pdf",
-        "source_uri": str(pdf_path),
-        "page_count": result.page_count,
-        "engine": result.engine,
+        "source_type": "web",
+        "source_uri": ex.source_uri,
+        "page_count": None,
+        "engine": ex.engine,
         "ingested_at": ingested_at,
     }
+    return doc_meta, cleaned
 
-    chunks = chunk_words(combined, chunk_size=cfg.chunk_words, overlap=cfg.chunk_overlap)
 
-    jsonl_rows: List[Dict[str, Any]] = []
-    sqlite_rows: List[Dict[str, Any]] = []
+def chunk_web_doc(
+    doc_meta: Dict[str, Any],
+    cleaned: str,
+    cfg: AtlasConfig,
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    chunks = ((cleaned[start:end], None, None) for start, end in iter_doc_chunk_spans([(0, cleaned)], cfg))
+    return build_chunk_rows(doc_meta["doc_id"], "web", doc_meta["source_uri"], chunks, doc_meta["ingested_at"], cfg)
 
-    for idx, ch in enumerate(chunks):
-        ch = normalize_text(ch)
-        if not ch:
-            continue
 
-        exact = sha256_text(ch)
-        simh = simhash64(ch)
+def build_web_doc_chunks(
+    url: str,
+    html: str,
+    cfg: AtlasConfig,
+    ingested_at: str,
+    content_kind: Optional[str] = None,
+    doc_dedupe: Optional[DocDeduper] = None,
+) -> Optional[tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """
+    Extract, clean and chunk one page. With doc_dedupe, a page whose cleaned
+    text duplicates an earlier document comes back with "duplicate_of" set
+    in its doc_meta and no chunks.
+    """
+    prepared = prepare_web_doc(url, html, cfg, ingested_at, content_kind)
+    if prepared is None:
+        return None
+    doc_meta, cleaned = prepared
+    if doc_dedupe is not None:
+        duplicate_of = doc_dedupe.add(doc_meta["doc_id"], doc_fingerprint(cleaned))
+        if duplicate_of is not None:
+            return {**doc_meta, "duplicate_of": duplicate_of}, [], []
+    jsonl_rows, sqlite_rows = chunk_web_doc(doc_meta, cleaned, cfg)
+    return doc_meta, jsonl_rows, sqlite_rows
+
+
+def _web_doc_job(
+    url: str,
+    html: str,
+    cfg: AtlasConfig,
+    ingested_at: str,
+    content_kind: Optional[str] = None,
+) -> Optional[tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    # Runs in a worker process; SQLite rows are rebuilt in the parent
+    built = build_web_doc_chunks(url, html, cfg, ingested_at, content_kind)
+    if built is None:
+        return None
+    doc_meta, jsonl_rows, _ = built
+    return doc_meta, jsonl_rows
+
+
+def _web_prepare_job(
+    url: str,
+    html: str,
+    cfg: AtlasConfig,
+    ingested_at: str,
+    content_kind: Optional[str] = None,
+) -> Optional[tuple[Dict[str, Any], str, DocFingerprint]]:
+    # Runs in a worker process: extraction and fingerprint, checked by the parent before chunking
+    prepared = prepare_web_doc(url, html, cfg, ingested_at, content_kind)
+    if prepared is None:
+        return None
+    doc_meta, cleaned = prepared
+    return doc_meta, cleaned, doc_fingerprint(cleaned)
+
 
-        row = {
-            "chunk_id": make_chunk_id(doc_id, ch[:4000], idx),
-            "doc_id": doc_id,
-            "chunk_index": idx,
-            "source_type": "pdf",
-            "source_uri": str(pdf_path),
-            "page_start": None,
-            "page_end": None,
-            "text": ch,
-            "quality": {
-                "lang": safe_lang(ch),
-                "gibberish_score": round(gibberish_score(ch), 4),
-                "char_len": len(ch),
-                "word_len": len(ch.split()),
-            },
-            "dedupe": {"exact_hash": exact, "simhash64": simh},
-            "timestamps": {"ingested_at": ingested_at},
-        }
-        jsonl_rows.append(row)
+def _web_chunk_job(doc_meta: Dict[str, Any], cleaned: str, cfg: AtlasConfig) -> List[Dict[str, Any]]:
+    # Runs in a worker process; see _web_prepare_job
+    jsonl_rows, _ = chunk_web_doc(doc_meta, cleaned, cfg)
+    return jsonl_rows
 
-        sqlite_rows.append(
-            {
-                "chunk_id": row["chunk_id"],
-                "doc_id": doc_id,
-                "chunk_index": idx,
-                "source_uri": str(pdf_path),
-                "page_start": None,
-                "page_end": None,
-                "exact_hash": exact,
-                "simhash64": str(simh) if simh is not None else None,
-                "char_len": row["quality"]["char_len"],
-                "word_len": row["quality"]["word_len"],
-                "lang": row["quality"]["lang"],
-                "gibberish_score": row["quality"]["gibberish_score"],
-                "ingested_at": ingested_at,
-            }
-        )
 
-    return doc_id, doc_meta, jsonl_rows, sqlite_rows
+def iter_web_doc_chunks(
+    pages: Iterable[tuple[str, str, Optional[str]]],
+    cfg: AtlasConfig,
+    ingested_at: str,
+    workers: int = 1,
+    doc_dedupe: Optional[DocDeduper] = None,
+) -> Iterator[tuple[str, Optional[tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]], Optional[Exception]]]:
+    """
+    Build chunks for stored (url, html, content_kind) pages, yielding
+    (url, (doc_meta, jsonl_rows, sqlite_rows) or None, error) in input order.
+
+    With workers > 1, pages are extracted in a process pool, at most
+    2 * workers ahead of the one being yielded. With doc_dedupe, documents
+    are checked in input order, as the serial path does, and only unique
+    ones are chunked.
+    """
+    if workers <= 1:
+        for url, html, content_kind in pages:
+            try:
+                yield url, build_web_doc_chunks(url, html, cfg, ingested_at, content_kind, doc_dedupe), None
+            except Exception as e:
+                yield url, None, e
+        return
+
+    first_job = _web_doc_job if doc_dedupe is None else _web_prepare_job
+    pages = iter(pages)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[tuple[str, Future]] = deque()
+        while True:
+            for url, html, content_kind in itertools.islice(pages, 2 * workers - len(pending)):
+                pending.append((url, pool.submit(first_job, url, html, cfg, ingested_at, content_kind)))
+            if not pending:
+                return
+            url, fut = pending.popleft()
+            try:
+                built = fut.result()
+                if built is not None and doc_dedupe is not None:
+                    doc_meta, cleaned, fingerprint = built
+                    duplicate_of = doc_dedupe.add(doc_meta["doc_id"], fingerprint)
+                    if duplicate_of is not None:
+                        built = {**doc_meta, "duplicate_of": duplicate_of}, []
+                    else:
+                        # Later pages keep extracting while this one is chunked
+                        built = doc_meta, pool.submit(_web_chunk_job, doc_meta, cleaned, cfg).result()
+            except Exception as e:
+                yield url, None, e
+                continue
+            if built is None:
+                yield url, None, None
+                continue
+            doc_meta, jsonl_rows = built
+            yield url, (doc_meta, jsonl_rows, [sqlite_row_from_chunk(r) for r in jsonl_rows]), None
 
 
 async def build_web_chunks_async(
     urls: List[str],
     cfg: AtlasConfig,
     ingested_at: str,
-) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
-    results = await crawl_urls(
-        urls,
-        concurrency=cfg.web_concurrency,
-        timeout_s=cfg.web_timeout_s,
-        retries=cfg.web_max_retries,
-        delay_s=cfg.web_delay_s,
-    )
+    http_cache_db: Optional[Path] = None,
+    capture: Optional[CaptureStore] = None,
+    frontier: Optional[Frontier] = None,
+    workers: int = 1,
+    doc_dedupe: Optional[DocDeduper] = None,
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]], List[str], List[CacheEntry]]:
+    """
+    Crawl, extract and chunk web pages. Also returns the URLs that turned out
+    to serve PDFs, so the caller can send them down the PDF path.
+    With a frontier, `urls` is ignored and links are followed from its seeds.
+
+    With http_cache_db, the validators of pages that produced a document are
+    returned rather than saved: the caller saves them once the documents are
+    stored, so a page that failed, or a run that stopped early, is fetched
+    again instead of coming back as unchanged. With a frontier, each page's
+    links are stored alongside, and only pages stored that way are
+    revalidated, so an unchanged page's links are still followed.
+
+    With workers > 1, extraction and chunking run in a process pool while the
+    crawl continues; at most 2 * workers pages are in flight, and when that
+    limit is hit the crawl loop waits, which in turn backs up the fetchers.
+
+    With doc_dedupe, pages are checked as they finish extraction, so of two
+    duplicates the first to finish is kept (as with mirrored payloads under
+    a capture store); only unique pages are chunked.
+    """
+    cache = None
+    if http_cache_db is not None:
+        init_http_cache(http_cache_db)
+        cache = load_cache_entries(http_cache_db, require_outlinks=frontier is not None)
+
+    # Per-URL outputs keyed by input position, so output order doesn't depend on completion order
+    per_url: Dict[int, tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+    validators: Dict[int, CacheEntry] = {}
+    unchanged = 0
+    seen_payloads: set[str] = set()
+    routed_pdfs: List[str] = []
+    skipped: Dict[str, int] = {}
+
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    slots = asyncio.Semaphore(max(1, 2 * workers))
+    inflight: set[asyncio.Task] = set()
+
+    async def extract_in_pool(pos: int, url: str, html: str, content_kind: Optional[str]) -> None:
+        try:
+            if doc_dedupe is None:
+                built = await loop.run_in_executor(pool, _web_doc_job, url, html, cfg, ingested_at, content_kind)
+            else:
+                built = None
+                prepared = await loop.run_in_executor(pool, _web_prepare_job, url, html, cfg, ingested_at, content_kind)
+                if prepared is not None:
+                    doc_meta, cleaned, fingerprint = prepared
+                    # Checked on the event loop thread, so no two pages race for the same slot
+                    duplicate_of = doc_dedupe.add(doc_meta["doc_id"], fingerprint)
+                    if duplicate_of is not None:
+                        built = {**doc_meta, "duplicate_of": duplicate_of}, []
+                    else:
+                        built = doc_meta, await loop.run_in_executor(pool, _web_chunk_job, doc_meta, cleaned, cfg)
+        except Exception as e:
+            print(f"[yellow]Web extract failed[/yellow] {url}: {e}")
+            built = None
+        finally:
+            slots.release()
+        if built is not None:
+            doc_meta, jsonl_rows = built
+            per_url[pos] = (doc_meta, jsonl_rows, [sqlite_row_from_chunk(r) for r in jsonl_rows])
 
-    docs_meta: List[Dict[str, Any]] = []
-    jsonl_rows: List[Dict[str, Any]] = []
-    sqlite_rows: List[Dict[str, Any]] = []
+    try:
+        # Pages are extracted and chunked as they arrive, while other fetches are in flight
+        async for pos, r in iter_crawl_indexed(
+            frontier.urls() if frontier is not None else urls,
+            concurrency=cfg.web_concurrency,
+            timeout_s=cfg.web_timeout_s,
+            retries=cfg.web_max_retries,
+            cache=cache,
+            host_rate=cfg.web_host_rate,
+            host_burst=cfg.web_host_burst,
+            host_max_conns=cfg.web_host_max_conns,
+            backoff_base_s=cfg.web_backoff_base_s,
+            backoff_max_s=cfg.web_backoff_max_s,
+            max_bytes=cfg.web_max_body_bytes,
+        ):
+            links = frontier.done(r) if frontier is not None else None
+            if http_cache_db is not None and not r.not_modified:
+                for entry in cache_entries_from_results([r], ingested_at):
+                    entry.outlinks = links
+                    validators[pos] = entry
+            if r.not_modified:
+                unchanged += 1
+            if r.skip_reason:
+                skipped[r.skip_reason] = skipped.get(r.skip_reason, 0) + 1
+                if r.skip_reason == "pdf":
+                    routed_pdfs.append(r.url)
+            if not r.ok or r.not_modified:
+                continue
 
-    for r in results:
-        if not r.ok:
-            continue
+            if capture is not None:
+                digest = capture.put_bytes(r.body)
+                capture.record(r.url, digest, r.content_kind or "html", len(r.body), ingested_at, r.encoding)
+                if digest in seen_payloads:
+                    continue  # mirrored page: extract once per unique payload
+                seen_payloads.add(digest)
+
+            if pool is not None:
+                await slots.acquire()
+                task = asyncio.create_task(extract_in_pool(pos, r.url, r.html, r.content_kind))
+                inflight.add(task)
+                task.add_done_callback(inflight.discard)
+                continue
 
-        ex = extract_main_text(r.url, r.html)
-        cleaned = normalize_text(ex.raw_text)
-        if not cleaned:
-            continue
+            try:
+                built = build_web_doc_chunks(r.url, r.html, cfg, ingested_at, r.content_kind, doc_dedupe)
+            except Exception as e:
+                print(f"[yellow]Web extract failed[/yellow] {r.url}: {e}")
+                continue
+            if built is not None:
+                per_url[pos] = built
+
+        if pool is not None:
+            await asyncio.gather(*inflight)
+    finally:
+        # Also reached on a crawl error or KeyboardInterrupt: don't leave tasks or workers behind
+        for task in inflight:
+            task.cancel()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if http_cache_db is not None:
+        print(f"- Web pages unchanged since last crawl: {unchanged}")
+    if skipped:
+        print(f"- Web bodies not kept: {skipped}")
 
-        doc_id = make_doc_id(ex.source_uri, cleaned[:5000])
+    docs_meta: List[Dict[str, Any]] = []
+    all_jsonl: List[Dict[str, Any]] = []
+    all_sqlite: List[Dict[str, Any]] = []
+    for pos in sorted(per_url):
+        doc_meta, jsonl_rows, sqlite_rows = per_url[pos]
+        docs_meta.append(doc_meta)
+        all_jsonl.extend(jsonl_rows)
+        all_sqlite.extend(sqlite_rows)
+    stored = [validators[pos] for pos in sorted(per_url) if pos in validators]
 
-        docs_meta.append(
-            {
-                "doc_id": doc_id,
-                "source_type": "web",
-                "source_uri": ex.source_uri,
-                "page_count": None,
-                "engine": "trafilatura",
-                "ingested_at": ingested_at,
-            }
+    return docs_meta, all_jsonl, all_sqlite, routed_pdfs, stored
+
+
+def build_capture_chunks(
+    capture: CaptureStore,
+    cfg: AtlasConfig,
+    ingested_at: str,
+    workers: int = 1,
+    extract_cache_db: Optional[Path] = None,
+    doc_dedupe: Optional[DocDeduper] = None,
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Re-run extraction/cleaning/chunking over a capture store, with no network.
+    Each unique payload is processed once, under the first URL it was captured
+    from, and documents come out in manifest order.
+
+    PDFs go through iter_pdf_chunks, with the extract cache keyed on the
+    SHA-256 the manifest already records, and web pages through
+    iter_web_doc_chunks; both honour `workers`. Under doc_dedupe the PDFs
+    are checked before the pages.
+    """
+    entries = list(capture.iter_manifest())
+    unique: List[CaptureEntry] = []
+    seen_payloads: set[str] = set()
+    for e in entries:
+        if e.sha256 not in seen_payloads:
+            seen_payloads.add(e.sha256)
+            unique.append(e)
+
+    built_at: Dict[int, tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+    pdf_pos = [i for i, e in enumerate(unique) if e.kind == "pdf"]
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_files: List[Path] = []
+        copied: List[int] = []
+        for i in pdf_pos:
+            try:
+                pdf_files.append(capture.copy_to(unique[i].sha256, Path(tmp) / f"{unique[i].sha256}.pdf"))
+            except Exception as ex:
+                print(f"[yellow]Capture replay failed[/yellow] {unique[i].url}: {ex}")
+                continue
+            copied.append(i)
+        results = iter_pdf_chunks(
+            pdf_files,
+            cfg,
+            ingested_at,
+            workers=workers,
+            extract_cache_db=extract_cache_db,
+            doc_dedupe=doc_dedupe,
+            source_uris=[unique[i].url for i in copied],
+            sha256s=[unique[i].sha256 for i in copied],
         )
+        for k, (_, built, err) in enumerate(results):
+            i = copied[k]
+            if err is not None:
+                print(f"[yellow]Capture replay failed[/yellow] {unique[i].url}: {err}")
+                continue
+            built_at[i] = built
 
-        chunks = chunk_words(cleaned, chunk_size=cfg.chunk_words, overlap=cfg.chunk_overlap)
+    page_pos = {e.url: i for i, e in enumerate(unique) if e.kind != "pdf"}
 
-        for idx, ch in enumerate(chunks):
-            ch = normalize_text(ch)
-            if not ch:
+    def pages() -> Iterator[tuple[str, str, Optional[str]]]:
+        for url in track(list(page_pos), description="Replaying captured pages"):
+            e = unique[page_pos[url]]
+            try:
+                html = capture.get_bytes(e.sha256).decode(e.encoding or "utf-8", errors="replace")
+            except Exception as ex:
+                print(f"[yellow]Capture replay failed[/yellow] {url}: {ex}")
                 continue
+            yield url, html, e.kind
 
-            exact = sha256_text(ch)
-            simh = simhash64(ch)
-
-            row = {
-                "chunk_id": make_chunk_id(doc_id, ch[:4000], idx),
-                "doc_id": doc_id,
-                "chunk_index": idx,
-                "source_type": "web",
-                "source_uri": ex.source_uri,
-                "page_start": None,
-                "page_end": None,
-                "text": ch,
-                "quality": {
-                    "lang": safe_lang(ch),
-                    "gibberish_score": round(gibberish_score(ch), 4),
-                    "char_len": len(ch),
-                    "word_len": len(ch.split()),
-                },
-                "dedupe": {"exact_hash": exact, "simhash64": simh},
-                "timestamps": {"ingested_at": ingested_at},
-            }
-            jsonl_rows.append(row)
-
-            sqlite_rows.append(
-                {
-                    "chunk_id": row["chunk_id"],
-                    "doc_id": doc_id,
-                    "chunk_index": idx,
-                    "source_uri": ex.source_uri,
-                    "page_start": None,
-                    "page_end": None,
-                    "exact_hash": exact,
-                    "simhash64": str(simh) if simh is not None else None,
-                    "char_len": row["quality"]["char_len"],
-                    "word_len": row["quality"]["word_len"],
-                    "lang": row["quality"]["lang"],
-                    "gibberish_score": row["quality"]["gibberish_score"],
-                    "ingested_at": ingested_at,
-                }
-            )
+    for url, built, err in iter_web_doc_chunks(pages(), cfg, ingested_at, workers=workers, doc_dedupe=doc_dedupe):
+        if err is not None:
+            print(f"[yellow]Capture replay failed[/yellow] {url}: {err}")
+            continue
+        if built is not None:
+            built_at[page_pos[url]] = built
 
+    docs_meta: List[Dict[str, Any]] = []
+    jsonl_rows: List[Dict[str, Any]] = []
+    sqlite_rows: List[Dict[str, Any]] = []
+    for i in sorted(built_at):
+        dm, jr, sr = built_at[i]
+        docs_meta.append(dm)
+        jsonl_rows.extend(jr)
+        sqlite_rows.extend(sr)
+
+    print(f"- Captured URLs: {len(entries)} (unique payloads: {len(unique)})")
     return docs_meta, jsonl_rows, sqlite_rows
 
 
@@ -240,8 +977,48 @@ def ingest(
     urls: Optional[Path] = typer.Option(None, "--urls", help="Text file with web URLs (one per line)"),
     out: Path = typer.Option(Path("out"), "--out", help="Output directory"),
     near_dup_threshold: int = typer.Option(3, "--near-dup-threshold", help="SimHash hamming threshold for near-duplicate removal"),
+    near_dup_method: str = typer.Option("simhash", "--near-dup-method", help="Near-duplicate removal: simhash (Hamming) or minhash (shingle Jaccard with LSH)"),
+    minhash_threshold: float = typer.Option(0.8, "--minhash-threshold", help="Estimated Jaccard similarity at which --near-dup-method minhash drops a chunk"),
+    http_cache: bool = typer.Option(False, "--http-cache", help="Revalidate URLs with ETag/Last-Modified cached in <out>/http_cache.db and skip unchanged ones"),
+    workers: int = typer.Option(1, "--workers", help="Worker processes for PDF and web extraction (PDFs largest first)"),
+    extract_cache: bool = typer.Option(False, "--extract-cache", help="Reuse per-page PDF text cached in <out>/extract_cache.db for unchanged files"),
+    seeds: Optional[Path] = typer.Option(None, "--seeds", help="Text file with seed URLs to crawl by following links"),
+    max_pages: int = typer.Option(AtlasConfig().crawl_max_pages, "--max-pages", help="Max pages to fetch when crawling from --seeds"),
+    max_depth: int = typer.Option(AtlasConfig().crawl_max_depth, "--max-depth", help="Max link depth from the seeds"),
+    capture_dir: Optional[Path] = typer.Option(None, "--capture-dir", help="Content-addressed store for raw fetched HTML/PDF bodies"),
+    from_capture: bool = typer.Option(False, "--from-capture", help="Reprocess everything in --capture-dir without any network or --pdf-dir input"),
+    web_extract: str = typer.Option(AtlasConfig().web_extract_mode, "--web-extract", help="Web extraction tier: recall (always trafilatura), balanced or fast"),
+    lang_backend: str = typer.Option(AtlasConfig().lang_backend, "--lang-backend", help="Language identification: langdetect or ngram (faster, offline)"),
+    chunk_mode: str = typer.Option(AtlasConfig().chunk_mode, "--chunk-mode", help="Chunk by words (350 per chunk) or tokens (whole sentences up to --chunk-tokens)"),
+    chunk_tokens: int = typer.Option(AtlasConfig().chunk_tokens, "--chunk-tokens", help="Token budget per chunk with --chunk-mode tokens"),
+    tokenizer: str = typer.Option(AtlasConfig().tokenizer, "--tokenizer", help="Token counter: regex (offline approximation) or tiktoken"),
+    dedupe_index: bool = typer.Option(False, "--dedupe-index", help="Also drop chunks kept by earlier runs, indexed in <out>/dedupe_index.db"),
+    doc_dedupe: bool = typer.Option(False, "--doc-dedupe", help="Drop duplicate documents (same cleaned text or close whole-document SimHash) before chunking; recorded as aliases in the docs table"),
+    doc_near_dup_threshold: int = typer.Option(2, "--doc-near-dup-threshold", help="Whole-document SimHash hamming threshold for --doc-dedupe"),
 ):
-    cfg = AtlasConfig(out_dir=out)
+    if web_extract not in EXTRACT_MODES:
+        print(f"[red]--web-extract must be one of: {', '.join(EXTRACT_MODES)}[/red]")
+        raise typer.Exit(code=2)
+    if lang_backend not in LANG_BACKENDS:
+        print(f"[red]--lang-backend must be one of: {', '.join(LANG_BACKENDS)}[/red]")
+        raise typer.Exit(code=2)
+    if chunk_mode not in CHUNK_MODES:
+        print(f"[red]--chunk-mode must be one of: {', '.join(CHUNK_MODES)}[/red]")
+        raise typer.Exit(code=2)
+    if near_dup_method not in NEAR_DUP_METHODS:
+        print(f"[red]--near-dup-method must be one of: {', '.join(NEAR_DUP_METHODS)}[/red]")
+        raise typer.Exit(code=2)
+    if tokenizer not in TOKENIZERS:
+        print(f"[red]--tokenizer must be one of: {', '.join(TOKENIZERS)}[/red]")
+        raise typer.Exit(code=2)
+    cfg = AtlasConfig(
+        out_dir=out,
+        web_extract_mode=web_extract,
+        lang_backend=lang_backend,
+        chunk_mode=chunk_mode,
+        chunk_tokens=chunk_tokens,
+        tokenizer=tokenizer,
+    )
     out.mkdir(parents=True, exist_ok=True)
 
     chunks_jsonl: List[Dict[str, Any]] = []
@@ -249,40 +1026,191 @@ def ingest(
     docs_meta: List[Dict[str, Any]] = []
 
     ingested_at = now_iso()
+    http_cache_db = out / "http_cache.db" if http_cache else None
+    extract_cache_db = out / "extract_cache.db" if extract_cache else None
+    if extract_cache_db is not None:
+        init_extract_cache(extract_cache_db)
+    index_db = out / "dedupe_index.db" if dedupe_index else None
+    index_is_new = index_db is not None and not index_db.exists()
+    if index_db is not None:
+        init_dedupe_index(index_db, threshold=near_dup_threshold)
+        if near_dup_threshold > index_threshold(index_db):
+            print(f"[red]{index_db} was built for --near-dup-threshold <= {index_threshold(index_db)}[/red]")
+            raise typer.Exit(code=2)
+    doc_deduper = DocDeduper(threshold=doc_near_dup_threshold) if doc_dedupe else None
+    unchanged_pdfs: set[Path] = set()
+    # Validators are saved only for documents written below, so failures are retried next run
+    validators: List[CacheEntry] = []
+    pdf_validators: Dict[Path, CacheEntry] = {}
+
+    if from_capture and capture_dir is None:
+        print("[red]--from-capture requires --capture-dir[/red]")
+        raise typer.Exit(code=2)
+    capture = CaptureStore(capture_dir) if capture_dir is not None else None
+
+    if from_capture:
+        print(f"[bold]Replaying capture:[/bold] {capture_dir}")
+        docs_meta, chunks_jsonl, chunks_sqlite = build_capture_chunks(
+            capture, cfg, ingested_at, workers=workers, extract_cache_db=extract_cache_db, doc_dedupe=doc_deduper
+        )
+        pdf_urls = pdf_dir = urls = seeds = None
+
+    dl_dir = cfg.raw_dir / "pdfs"
 
     if pdf_urls:
         pdf_url_list = load_lines(pdf_urls)
-        dl_dir = Path("data/raw/pdfs")
         print(f"[bold]Downloading PDFs:[/bold] {len(pdf_url_list)} -> {dl_dir}")
-        for u in track(pdf_url_list, description="Downloading PDFs"):
-            try:
-                download_pdf(u, dl_dir)
-            except Exception as e:
-                print(f"[yellow]PDF download failed[/yellow] {u}: {e}")
+        pdf_cache = None
+        if http_cache_db is not None:
+            init_http_cache(http_cache_db)
+            pdf_cache = load_cache_entries(http_cache_db)
+        dl_results = asyncio.run(
+            download_pdfs(
+                pdf_url_list,
+                dl_dir,
+                concurrency=cfg.pdf_download_concurrency,
+                timeout_s=cfg.pdf_download_timeout_s,
+                cache=pdf_cache,
+            )
+        )
+        if http_cache_db is not None:
+            downloaded = {r.url: r.path.resolve() for r in dl_results if r.ok and r.path and not r.not_modified}
+            pdf_validators = {
+                downloaded[e.url]: e
+                for e in cache_entries_from_results(dl_results, ingested_at)
+                if e.url in downloaded
+            }
+            unchanged_pdfs = {r.path.resolve() for r in dl_results if r.not_modified and r.path}
+            print(f"- PDFs unchanged since last download: {len(unchanged_pdfs)}")
+        for r in dl_results:
+            if not r.ok:
+                print(f"[yellow]PDF download failed[/yellow] {r.url}: {r.error}")
+        if capture is not None:
+            for r in dl_results:
+                if r.ok and r.path is not None:
+                    capture.record(r.url, capture.put_file(r.path), "pdf", r.path.stat().st_size, ingested_at)
+        n_ok = sum(1 for r in dl_results if r.ok)
+        print(f"- Downloaded: {n_ok}/{len(dl_results)} (skipped existing: {sum(1 for r in dl_results if r.skipped)})")
 
     if pdf_dir and pdf_dir.exists():
-        pdf_files = sorted(pdf_dir.glob("*.pdf"))
+        pdf_files = [p for p in sorted(pdf_dir.glob("*.pdf")) if p.resolve() not in unchanged_pdfs]
         print(f"[bold]PDFs found:[/bold] {len(pdf_files)}")
-        for p in track(pdf_files, description="Processing PDFs"):
-            try:
-                _, doc_meta, jsonl_rows, sqlite_rows = build_pdf_chunks(p, cfg, ingested_at)
-                docs_meta.append(doc_meta)
-                chunks_jsonl.extend(jsonl_rows)
-                chunks_sqlite.extend(sqlite_rows)
-            except Exception as e:
-                print(f"[yellow]PDF ingest failed[/yellow] {p}: {e}")
-
-    if urls:
-        web_urls = load_lines(urls)
-        print(f"[bold]Web URLs found:[/bold] {len(web_urls)}")
+        if capture is not None:
+            seen_payloads: set[str] = set()
+            unique_files: List[Path] = []
+            for p in pdf_files:
+                try:
+                    digest = capture.put_file(p)
+                    capture.record(str(p), digest, "pdf", p.stat().st_size, ingested_at)
+                except Exception as e:
+                    print(f"[yellow]PDF ingest failed[/yellow] {p}: {e}")
+                    continue
+                if digest in seen_payloads:
+                    continue  # mirrored PDF: extract once per unique payload
+                seen_payloads.add(digest)
+                unique_files.append(p)
+            pdf_files = unique_files
+        for p, built, err in iter_pdf_chunks(
+            pdf_files, cfg, ingested_at, workers=workers, extract_cache_db=extract_cache_db, doc_dedupe=doc_deduper
+        ):
+            if err is not None:
+                print(f"[yellow]PDF ingest failed[/yellow] {p}: {err}")
+                continue
+            doc_meta, jsonl_rows, sqlite_rows = built
+            docs_meta.append(doc_meta)
+            chunks_jsonl.extend(jsonl_rows)
+            chunks_sqlite.extend(sqlite_rows)
+            if p.resolve() in pdf_validators:
+                validators.append(pdf_validators[p.resolve()])
+
+    if urls or seeds:
+        frontier = None
+        if seeds:
+            seed_urls = load_lines(seeds)
+            frontier = Frontier(seed_urls, max_pages=max_pages, max_depth=max_depth, http_cache_db=http_cache_db)
+            web_urls: List[str] = []
+            print(f"[bold]Crawling from seeds:[/bold] {len(seed_urls)} (max pages {max_pages}, max depth {max_depth})")
+        else:
+            raw_urls = load_lines(urls)
+            web_urls = list(unique_urls(raw_urls))
+            print(f"[bold]Web URLs found:[/bold] {len(web_urls)} (duplicates after canonicalization: {len(raw_urls) - len(web_urls)})")
         try:
-            dm, jr, sr = asyncio.run(build_web_chunks_async(web_urls, cfg, ingested_at))
+            dm, jr, sr, routed_pdfs, web_validators = asyncio.run(
+                build_web_chunks_async(
+                    web_urls,
+                    cfg,
+                    ingested_at,
+                    http_cache_db=http_cache_db,
+                    capture=capture,
+                    frontier=frontier,
+                    workers=workers,
+                    doc_dedupe=doc_deduper,
+                )
+            )
             docs_meta.extend(dm)
             chunks_jsonl.extend(jr)
             chunks_sqlite.extend(sr)
+            validators.extend(web_validators)
         except Exception as e:
+            routed_pdfs = []
             print(f"[yellow]Web ingest failed[/yellow]: {e}")
 
+        if routed_pdfs:
+            print(f"[bold]PDFs found while crawling:[/bold] {len(routed_pdfs)} -> {dl_dir}")
+            routed_cache = load_cache_entries(http_cache_db) if http_cache_db is not None else None
+            dl_results = asyncio.run(
+                download_pdfs(
+                    routed_pdfs,
+                    dl_dir,
+                    concurrency=cfg.pdf_download_concurrency,
+                    timeout_s=cfg.pdf_download_timeout_s,
+                    cache=routed_cache,
+                )
+            )
+            routed = []
+            for r in dl_results:
+                if not r.ok or r.path is None:
+                    print(f"[yellow]PDF download failed[/yellow] {r.url}: {r.error}")
+                    continue
+                if r.not_modified:
+                    continue
+                if capture is not None:
+                    try:
+                        capture.record(r.url, capture.put_file(r.path), "pdf", r.path.stat().st_size, ingested_at)
+                    except Exception as e:
+                        print(f"[yellow]PDF ingest failed[/yellow] {r.url}: {e}")
+                        continue
+                routed.append(r)
+            if http_cache_db is not None:
+                print(f"- Crawled PDFs unchanged since last download: {sum(1 for r in dl_results if r.not_modified)}")
+            routed_validators = {e.url: e for e in cache_entries_from_results(routed, ingested_at)}
+            for k, (_, built, err) in enumerate(iter_pdf_chunks(
+                [r.path for r in routed],
+                cfg,
+                ingested_at,
+                workers=workers,
+                extract_cache_db=extract_cache_db,
+                doc_dedupe=doc_deduper,
+                source_uris=[r.url for r in routed],
+            )):
+                url = routed[k].url
+                if err is not None:
+                    print(f"[yellow]PDF ingest failed[/yellow] {url}: {err}")
+                    continue
+                doc_meta, jsonl_rows, sqlite_rows = built
+                docs_meta.append(doc_meta)
+                chunks_jsonl.extend(jsonl_rows)
+                chunks_sqlite.extend(sqlite_rows)
+                if http_cache_db is not None and url in routed_validators:
+                    validators.append(routed_validators[url])
+
+    if capture is not None:
+        capture.close()
+
+    if not chunks_jsonl and http_cache:
+        print("[yellow]No new or changed content since the last run.[/yellow]")
+        return
+
     if not chunks_jsonl:
         print("[red]No chunks produced.[/red] Check your inputs.")
         raise typer.Exit(code=1)
@@ -297,22 +1225,42 @@ def ingest(
     chunks_jsonl = [r for r in chunks_jsonl if r["chunk_id"] in kept_chunk_ids]
     chunks_sqlite = [r for r in chunks_sqlite if r["chunk_id"] in kept_chunk_ids]
 
-    simhashes = [r["dedupe"]["simhash64"] for r in chunks_jsonl]
-    keep_mask = dedupe_near_simhash(simhashes, threshold=near_dup_threshold)
+    if near_dup_method == "minhash":
+        keep_mask = dedupe_near_minhash([r["text"] for r in chunks_jsonl], threshold=minhash_threshold)
+    else:
+        keep_mask = dedupe_near_simhash([r["dedupe"]["simhash64"] for r in chunks_jsonl], threshold=near_dup_threshold)
     chunks_jsonl = [r for r, k in zip(chunks_jsonl, keep_mask) if k]
     kept_ids_after_near = {r["chunk_id"] for r in chunks_jsonl}
     chunks_sqlite = [r for r in chunks_sqlite if r["chunk_id"] in kept_ids_after_near]
 
+    removed_near = before - removed_exact - len(chunks_jsonl)
+
+    db_path = out / "atlas.db"
+    removed_seen = 0
+    if index_db is not None:
+        if index_is_new and db_path.exists():
+            # Start from whatever an earlier run without the index already wrote
+            init_db(db_path)
+            add_to_dedupe_index(index_db, *load_chunk_hashes(db_path))
+        seen_hashes = seen_exact_hashes(index_db, [r["dedupe"]["exact_hash"] for r in chunks_jsonl])
+        fresh = [r for r in chunks_jsonl if r["dedupe"]["exact_hash"] not in seen_hashes]
+        near = near_seen(index_db, [r["dedupe"]["simhash64"] for r in fresh], threshold=near_dup_threshold)
+        fresh = [r for r, seen in zip(fresh, near) if not seen]
+        removed_seen = len(chunks_jsonl) - len(fresh)
+        kept_ids_after_index = {r["chunk_id"] for r in fresh}
+        chunks_jsonl = fresh
+        chunks_sqlite = [r for r in chunks_sqlite if r["chunk_id"] in kept_ids_after_index]
+
     after = len(chunks_jsonl)
-    removed_near = before - removed_exact - after
 
     chunks_path = out / "chunks.jsonl"
     write_jsonl(chunks_path, chunks_jsonl)
 
-    db_path = out / "atlas.db"
     init_db(db_path)
 
     for d in docs_meta:
+        if d.get("duplicate_of") == d["doc_id"]:
+            continue  # the same document again: its row is already there
         upsert_doc(
             db_path=db_path,
             doc_id=d["doc_id"],
@@ -321,14 +1269,28 @@ def ingest(
             ingested_at=d["ingested_at"],
             page_count=d.get("page_count"),
             engine=d.get("engine"),
+            duplicate_of=d.get("duplicate_of"),
         )
 
     insert_chunks(db_path, chunks_sqlite)
+    if index_db is not None:
+        # Only once the chunks are stored: an indexed chunk is never ingested again
+        add_to_dedupe_index(
+            index_db,
+            [r["dedupe"]["exact_hash"] for r in chunks_jsonl],
+            [r["dedupe"]["simhash64"] for r in chunks_jsonl],
+        )
+    if http_cache_db is not None and validators:
+        save_cache_entries(http_cache_db, validators)
 
     print("\n[bold green]Ingest complete[/bold green]")
+    if doc_deduper is not None:
+        print(f"- Duplicate documents:  {doc_deduper.duplicates} (not chunked)")
     print(f"- Chunks before dedupe: {before}")
     print(f"- Removed exact dupes:  {removed_exact}")
     print(f"- Removed near dupes:   {max(0, removed_near)}")
+    if index_db is not None:
+        print(f"- Seen in earlier runs: {removed_seen}")
     print(f"- Chunks kept:          {after}")
     print(f"- Wrote: {chunks_path}")
     print(f"- Wrote: {db_path}")
@@ -413,5 +1375,19 @@ def dataset(
     print(f"- Rows: {stats['written']} (skipped_short={stats['skipped_short']})")
 
 
+@app.command("bench-near-dup")
+def bench_near_dup(
+    sizes: str = typer.Option("10000,100000,1000000,10000000", "--sizes", help="Comma-separated fingerprint counts"),
+    threshold: int = typer.Option(3, "--threshold", help="SimHash hamming threshold"),
+    out: Path = typer.Option(Path("out/report_near_dup.md"), "--out", help="Output report (markdown)"),
+):
+    stats = run_near_dup_bench([int(x) for x in sizes.split(",") if x.strip()], out, threshold=threshold)
+    print("[bold green]Near-dup benchmark complete[/bold green]")
+    for r in stats["runs"]:
+        check = "" if r["matches_pairwise"] is None else f", matches pairwise: {r['matches_pairwise']}"
+        print(f"- {r['n']} fingerprints: {r['seconds']:.2f}s, kept {r['kept']}{check}")
+    print(f"- Wrote: {out}")
+
+
 if __name__ == "__main__":
     app()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 
 @dataclass(frozen=True)
@@ -13,12 +14,48 @@ class AtlasConfig:
     # Chunking
     chunk_words: int = 350
     chunk_overlap: int = 50
+    # "words" packs chunk_words whitespace words; "tokens" packs whole sentences
+    # up to chunk_tokens tokens (see atlas/chunk/tokens.py) for consumers with hard limits
+    chunk_mode: str = "words"
+    chunk_tokens: int = 512
+    chunk_overlap_tokens: int = 64
+    tokenizer: str = "regex"  # offline approximation; "tiktoken" for exact cl100k counts
+
+    # Language identification (see atlas/clean/language.py): detected once per
+    # document, chunks re-checked only when their script or common words shift
+    lang_backend: str = "langdetect"  # or "ngram": deterministic naive Bayes, ~2x faster
+    lang_seed: Optional[int] = 0  # fixes langdetect's random sampling; None = unseeded
 
     # Web crawling
     web_concurrency: int = 40
     web_timeout_s: int = 25
     web_max_retries: int = 2
-    web_delay_s: float = 0.0  # add 0.05–0.2 if you want politeness
+    # Per-host politeness (see atlas/acquire/host_scheduler.py)
+    web_host_rate: float = 5.0  # requests/s per host; 0 disables the token bucket
+    web_host_burst: int = 10
+    web_host_max_conns: int = 6
+    web_backoff_base_s: float = 1.0
+    web_backoff_max_s: float = 60.0  # also caps how long a Retry-After can pause a host
+    web_max_body_bytes: int = 10_000_000  # larger bodies are dropped while streaming
+
+    # Web extraction tiers (see atlas/extract/web_extract.py): "recall", "balanced" or "fast"
+    web_extract_mode: str = "recall"
+    web_fast_min_chars: int = 500  # "balanced": shorter fast-pass results go to trafilatura
+    web_fast_max_link_density: float = 0.4  # ...as do link-heavy ones (menus, listings)
+    web_min_visible_chars: int = 25  # all modes: pages with less visible text are treated as empty
+
+    # Link-following crawl (--seeds)
+    crawl_max_pages: int = 1000
+    crawl_max_depth: int = 2
+
+    # PDF downloads
+    pdf_download_concurrency: int = 16
+    pdf_download_timeout_s: int = 60
+
+    # Parallel PDF extraction (--workers > 1): split long documents into page ranges
+    pdf_split_min_bytes: int = 5_000_000  # only files this large are opened to count pages
+    pdf_split_min_pages: int = 400
+    pdf_range_pages: int = 200
 
     # OpenSearch
     opensearch_url: str = "http://localhost:9200"
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from atlas.dedupe.simhash import _tokenize, _token_votes, block_masks, hamming_distance64, simhash64_votes
+
+
+_PAGE_SEP = b"\n\n"  # PagedText.SEP: cleaned pages are joined by a blank line
+
+
+@dataclass(frozen=True)
+class DocFingerprint:
+    exact_hash: str  # SHA-256 of the cleaned document text
+    simhash64: int  # SimHash of the whole document
+    tokens: int  # tokens behind simhash64
+
+
+class DocFingerprinter:
+    """
+    DocFingerprint of a document fed one cleaned page at a time; pages are
+    joined by a blank line, so the result equals doc_fingerprint of the
+    joined text without holding it.
+    """
+
+    def __init__(self) -> None:
+        self._sha = hashlib.sha256()
+        self._votes = 0
+        self._tokens = 0
+        self._empty = True
+
+    def update(self, text: str) -> None:
+        if not self._empty:
+            self._sha.update(_PAGE_SEP)
+        self._sha.update(text.encode("utf-8", errors="ignore"))
+        self._empty = False
+        # Tokens never span the separator, so votes add up across pages
+        tokens = _tokenize(text)
+        self._votes += sum(map(_token_votes, tokens))
+        self._tokens += len(tokens)
+
+    def fingerprint(self) -> DocFingerprint:
+        return DocFingerprint(
+            exact_hash=self._sha.hexdigest(),
+            simhash64=simhash64_votes(self._votes, self._tokens) if self._tokens else 0,
+            tokens=self._tokens,
+        )
+
+
+def doc_fingerprint(text: str) -> DocFingerprint:
+    f = DocFingerprinter()
+    f.update(text)
+    return f.fingerprint()
+
+
+class DocDeduper:
+    """
+    Documents kept so far in a run, for dropping duplicate documents before
+    they are chunked. add() registers a document, or returns the doc_id of
+    a kept one it duplicates: the same cleaned text, or a whole-document
+    SimHash within `threshold` bits.
+
+    Whole-document fingerprints of unrelated documents sit further apart
+    than chunk fingerprints, but not by much, hence the lower default than
+    chunk-level dedupe. Documents with fewer than min_tokens ASCII tokens
+    (short pages, non-Latin scripts, which SimHash tokenizes poorly) are
+    matched exactly only.
+    """
+
+    def __init__(self, threshold: int = 2, min_tokens: int = 50) -> None:
+        self.threshold = threshold
+        self.min_tokens = min_tokens
+        self._exact: Dict[str, str] = {}
+        self._masks = block_masks(threshold, blocks=threshold + 2)
+        self._tables: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in self._masks]
+        self.duplicates = 0
+
+    def _near(self, fp: int) -> Optional[str]:
+        for table, mask in zip(self._tables, self._masks):
+            for other, doc_id in table.get(fp & mask, ()):
+                if hamming_distance64(fp, other) <= self.threshold:
+                    return doc_id
+        return None
+
+    def add(self, doc_id: str, fp: DocFingerprint) -> Optional[str]:
+        """
+        The doc_id this document duplicates, or None after registering it as kept.
+        """
+        near = fp.tokens >= self.min_tokens
+        dup = self._exact.get(fp.exact_hash)
+        if dup is None and near:
+            dup = self._near(fp.simhash64)
+        if dup is not None:
+            self.duplicates += 1
+            return dup
+        self._exact[fp.exact_hash] = doc_id
+        if near:
+            for table, mask in zip(self._tables, self._masks):
+                table.setdefault(fp.simhash64 & mask, []).append((fp.simhash64, doc_id))
+        return None
@@ -0,0 +1,266 @@
+from __future__ import annotations
+import re
+import tempfile
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from atlas.dedupe.simhash import _hash64
+
+
+NEAR_DUP_METHODS = ("simhash", "minhash")
+
+_WORD_RE = re.compile(r"\w+")  # Unicode-aware, so non-Latin text still gets shingles
+_MAX_U32 = np.uint32(0xFFFFFFFF)
+_token_hash = lru_cache(maxsize=1 << 18)(_hash64)
+
+
+def lsh_params(threshold: float, num_perm: int = 128) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows <= num_perm whose S-curve
+    1 - (1 - s^rows)^bands best separates pairs above and below the Jaccard
+    threshold: the sum of the false-positive area under it and the
+    false-negative area over it is smallest.
+    """
+    lo = np.linspace(0.0, threshold, 200)
+    hi = np.linspace(threshold, 1.0, 200)
+    best = (1, num_perm)
+    best_err = float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        fp = np.trapezoid(1 - (1 - lo ** rows) ** bands, lo)
+        fn = np.trapezoid((1 - hi ** rows) ** bands, hi)
+        if fp + fn < best_err:
+            best, best_err = (bands, rows), fp + fn
+    return best
+
+
+def _array(shape: Tuple[int, ...], dtype: type, max_memory: int) -> np.ndarray:
+    # In memory when small, else backed by an anonymous temporary file
+    if int(np.prod(shape)) * np.dtype(dtype).itemsize <= max_memory:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode="w+", shape=shape)
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles. Each shingle (`shingle` consecutive
+    lowercased words) is hashed to 64 bits; permutation i maps it to
+    (a_i * x + b_i) >> 32 (multiply-shift, a_i odd), and the signature keeps
+    each permutation's minimum. The same seed always gives the same
+    signatures.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle: int = 5, seed: int = 1) -> None:
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        # Mixes a shingle's word hashes by position
+        self.mix = rng.integers(0, 1 << 63, size=shingle, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def shingle_hashes(self, token_lists: Sequence[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hashes of every text's shingles, concatenated, and each text's count.
+        A text shorter than `shingle` words is one shingle; one with no words has none.
+        """
+        lengths = np.array([len(t) for t in token_lists], dtype=np.int64)
+        if not lengths.sum():
+            return np.empty(0, dtype=np.uint64), np.zeros(len(token_lists), dtype=np.int64)
+        vocab = {t: k for k, t in enumerate(dict.fromkeys(t for tokens in token_lists for t in tokens))}
+        word_hash = np.fromiter(map(_token_hash, vocab), dtype=np.uint64, count=len(vocab))
+        flat = word_hash[np.fromiter(
+            (vocab[t] for tokens in token_lists for t in tokens), dtype=np.int64, count=int(lengths.sum())
+        )]
+
+        ends = np.cumsum(lengths)
+        counts = np.where(lengths > 0, np.maximum(lengths - self.shingle + 1, 1), 0)
+        text_of = np.repeat(np.arange(len(token_lists)), counts)
+        starts = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        starts += np.repeat(ends - lengths, counts)
+        out = np.zeros(len(starts), dtype=np.uint64)
+        for i in range(self.shingle):
+            idx = starts + i
+            inside = idx < ends[text_of]
+            out += np.where(inside, flat[np.minimum(idx, len(flat) - 1)] * self.mix[i], np.uint64(0))
+        return out, counts
+
+    def signatures(
+        self,
+        texts: Sequence[str],
+        out: Optional[np.ndarray] = None,
+        max_shingles: int = 1 << 15,
+    ) -> np.ndarray:
+        """
+        (len(texts), num_perm) uint32 signatures, written into `out` if given.
+        Texts are processed about max_shingles shingles at a time. A text with
+        no words gets all-0xFFFFFFFF (see has_words).
+        """
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32) if out is None else out
+        start = 0
+        while start < len(texts):
+            end, size = start, 0
+            token_lists: List[List[str]] = []
+            while end < len(texts) and (not token_lists or size < max_shingles):
+                tokens = _WORD_RE.findall(texts[end].lower())
+                token_lists.append(tokens)
+                size += max(1, len(tokens) - self.shingle + 1)
+                end += 1
+            hashes, counts = self.shingle_hashes(token_lists)
+            sig = np.full((end - start, self.num_perm), _MAX_U32, dtype=np.uint32)
+            nonempty = counts > 0
+            if hashes.size:
+                # (perm, shingle) layout keeps each text's segment contiguous for reduceat;
+                # the shift commutes with min, so it is applied to the minima only
+                perm = self.a[:, None] * hashes[None, :] + self.b[:, None]
+                seg = np.concatenate(([0], np.cumsum(counts)[:-1]))[nonempty]
+                sig[nonempty] = (np.minimum.reduceat(perm, seg, axis=1) >> np.uint64(32)).astype(np.uint32).T
+            out[start:end] = sig
+            start = end
+        return out
+
+
+def has_words(texts: Sequence[str]) -> np.ndarray:
+    return np.fromiter((_WORD_RE.search(t) is not None for t in texts), dtype=bool, count=len(texts))
+
+
+def _band_buckets(band_keys: np.ndarray, max_memory: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per band: the rows in key order (ties in index order), each row's
+    position in that order, and the start of the bucket at each position.
+    Arrays are (bands, n), spilled to temporary files past max_memory.
+    """
+    bands, n = band_keys.shape
+    dtype = np.int32 if n < (1 << 31) else np.int64
+    order = _array((bands, n), dtype, max_memory)
+    pos = _array((bands, n), dtype, max_memory)
+    start = _array((bands, n), dtype, max_memory)
+    positions = np.arange(n)
+    for band in range(bands):
+        keys = np.asarray(band_keys[band])
+        o = np.argsort(keys, kind="stable")
+        sk = keys[o]
+        new_bucket = np.r_[True, sk[1:] != sk[:-1]]
+        order[band] = o
+        pos[band, o] = positions
+        start[band] = np.maximum.accumulate(np.where(new_bucket, positions, 0))
+    return order, pos, start
+
+
+def minhash_candidate_pairs(
+    order: np.ndarray,
+    pos: np.ndarray,
+    start: np.ndarray,
+    s: int,
+    e: int,
+    max_bucket: int = 32,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Candidate pairs (i, j), i < j, for rows j in [s, e), sorted by (j, i):
+    rows sharing a bucket in some band (see _band_buckets). Within a bucket
+    (in index order) each row is paired with its max_bucket predecessors and
+    with the bucket's first max_bucket rows, so buckets up to
+    2 * max_bucket + 1 rows give every pair, and a huge bucket of
+    boilerplate costs O(size * max_bucket) while still meeting its earliest
+    (likeliest kept) rows. A block yields at most
+    (e - s) * bands * 2 * max_bucket pairs, whatever n is.
+    """
+    found: List[np.ndarray] = []
+    for band in range(order.shape[0]):
+        p = np.asarray(pos[band, s:e], dtype=np.int64)
+        base = np.asarray(start[band][p], dtype=np.int64)
+        rank = p - base  # 0-based offset inside the bucket
+        rows = np.arange(s, e)
+        # Predecessors: rows at positions p - 1 ... p - max_bucket of the same bucket
+        q, r, j = p, rank, rows
+        for d in range(1, max_bucket + 1):
+            keep = r >= d
+            q, r, j = q[keep], r[keep], j[keep]
+            if not q.size:
+                break
+            found.append(np.stack((order[band][q - d], j)))
+        # The bucket's first rows, for rows past the predecessors' reach
+        far = rank > max_bucket
+        b, r, j = base[far], rank[far], rows[far]
+        for f in range(max_bucket):
+            keep = r - f > max_bucket
+            b, r, j = b[keep], r[keep], j[keep]
+            if not b.size:
+                break
+            found.append(np.stack((order[band][b + f], j)))
+    if not found:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    pairs = np.concatenate(found, axis=1).astype(np.int64)
+    n = order.shape[1]
+    packed = np.unique((pairs[1] - s) * n + pairs[0])  # the same pair can meet in several bands
+    return packed % n, packed // n + s
+
+
+def dedupe_near_minhash(
+    texts: Sequence[str],
+    threshold: float = 0.8,
+    num_perm: int = 128,
+    shingle: int = 5,
+    seed: int = 1,
+    max_bucket: int = 32,
+    max_memory: int = 256 << 20,
+) -> List[bool]:
+    """
+    Keep mask (True=keep) for near-duplicate texts by estimated Jaccard
+    similarity of word shingles: an item is dropped when an earlier kept item
+    is at least `threshold` similar, as dedupe_near_simhash does for Hamming
+    distance. Candidates come from banded LSH (lsh_params), so pairs near
+    the threshold are found with high probability, not certainty.
+
+    Signatures and bucket arrays live in temporary files past max_memory
+    bytes. Rows are decided a block at a time, in index order: a block's
+    candidate pairs are generated, checked and walked first-occurrence-wins
+    before the next block's, so memory is bounded by the block size, not by
+    the number of pairs, and stays flat for tens of millions of texts or
+    huge boilerplate buckets. Texts without words are always kept.
+    """
+    n = len(texts)
+    if n == 0:
+        return []
+    hasher = MinHasher(num_perm=num_perm, shingle=shingle, seed=seed)
+    bands, rows = lsh_params(threshold, num_perm)
+
+    sigs = hasher.signatures(texts, out=_array((n, num_perm), np.uint32, max_memory))
+    band_keys = _array((bands, n), np.uint64, max_memory)
+    mix = np.random.default_rng(seed + 1).integers(0, 1 << 63, size=rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    words = has_words(texts)
+    # Rows per block when reading signatures back: a block's working copies use about max_memory / 8
+    step = max(1024, max_memory // (64 * num_perm))
+    for s in range(0, n, step):
+        block = sigs[s:s + step].astype(np.uint64)
+        for band in range(bands):
+            keys = (block[:, band * rows:(band + 1) * rows] * mix).sum(axis=1, dtype=np.uint64)
+            # Texts without words must not share a bucket: give each its index as key
+            own = np.arange(s, s + len(block), dtype=np.uint64)
+            band_keys[band, s:s + step] = np.where(words[s:s + step], keys, own)
+    order, pos, start = _band_buckets(band_keys, max_memory)
+    del band_keys
+
+    keep = np.ones(n, dtype=bool)
+    # Rows per block of decisions: a block's pairs (16 bytes each) and their working copies stay near max_memory / 2
+    rows_per_block = max(1, max_memory // (bands * 2 * max_bucket * 128))
+    for s in range(0, n, rows_per_block):
+        e = min(n, s + rows_per_block)
+        a, b = minhash_candidate_pairs(order, pos, start, s, e, max_bucket=max_bucket)
+        # Rows before the block are decided; a dropped one cannot drop anything
+        live = keep[a] & words[a] & words[b]
+        a, b = a[live], b[live]
+        close = np.zeros(len(a), dtype=bool)
+        for k in range(0, len(a), step):
+            sim = (sigs[a[k:k + step]] == sigs[b[k:k + step]]).mean(axis=1)
+            close[k:k + step] = sim >= threshold
+        # Pairs come sorted by (b, a), so every pair deciding a has been seen
+        block_keep = keep[s:e].tolist()
+        for x, y in zip(a[close].tolist(), b[close].tolist()):
+            if (x < s or block_keep[x - s]) and block_keep[y - s]:
+                block_keep[y - s] = False
+        keep[s:e] = block_keep
+    return keep.tolist()
@@ -1,7 +1,12 @@
 from __future__ import annotations
-from typing import Iterable, List
+from functools import lru_cache
+from itertools import combinations
+from math import comb, log2
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 import re
 
+import numpy as np
+
 
 _TOKEN_RE = re.compile(r"[a-zA-Z0-9]+")
 
@@ -20,39 +25,288 @@ def _hash64(s: str) -> int:
     return h
 
 
-def simhash64(text: str) -> int:
+# Bit votes are summed as 64 fields of _FIELD_BITS bits packed into one int,
+# so adding a token is one big-int addition instead of 64 Python steps
+_FIELD_BITS = 32
+_FIELD_MASK = (1 << _FIELD_BITS) - 1
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_votes(token: str) -> int:
+    # One field per hash bit, set to 1 where the token's hash has that bit
+    h = _hash64(token)
+    packed = 0
+    for i in range(64):
+        if (h >> i) & 1:
+            packed |= 1 << (i * _FIELD_BITS)
+    return packed
+
+
+def simhash64_tokens(tokens: List[str]) -> int:
     """
-    Compute 64-bit SimHash for text.
+    SimHash of an already tokenized text (see _tokenize). Token hashes are
+    cached across calls, so repeated vocabulary is hashed once.
     """
-    tokens = _tokenize(text)
     if not tokens:
         return 0
+    return simhash64_votes(sum(map(_token_votes, tokens)), len(tokens))
 
-    v = [0] * 64
-    for tok in tokens:
-        h = _hash64(tok)
-        for i in range(64):
-            bit = (h >> i) & 1
-            v[i] += 1 if bit else -1
 
+def simhash64_votes(votes: int, n: int) -> int:
+    """
+    SimHash from packed bit votes (sums of _token_votes) over n tokens, so a
+    long text can be fingerprinted piece by piece.
+    """
     out = 0
     for i in range(64):
-        if v[i] > 0:
+        # Bit i is set when more tokens have it than lack it
+        if 2 * ((votes >> (i * _FIELD_BITS)) & _FIELD_MASK) > n:
             out |= (1 << i)
     return out
 
 
+def simhash64(text: str) -> int:
+    """
+    Compute 64-bit SimHash for text.
+    """
+    return simhash64_tokens(_tokenize(text))
+
+
+_FNV_OFFSET = np.uint64(1469598103934665603)
+_FNV_PRIME = np.uint64(1099511628211)
+_HASH_MEMO: Dict[str, int] = {}  # token -> _hash64, shared by batches in this process
+_HASH_MEMO_MAX = 1 << 18
+_MAX_ARRAY_TOKEN = 32  # longer tokens are hashed one by one
+
+
+def _hash64_array(tokens: List[str]) -> np.ndarray:
+    """
+    _hash64 of many tokens as a uint64 array. Tokens seen before come from a
+    process-wide memo; new short ones run FNV-1a column by column over a
+    padded byte matrix (uint64 multiply wraps like the & mask in _hash64).
+    """
+    out = np.fromiter((_HASH_MEMO.get(t, 0) for t in tokens), dtype=np.uint64, count=len(tokens))
+    new = [k for k, t in enumerate(tokens) if t not in _HASH_MEMO]
+    if not new:
+        return out
+    short = [k for k in new if len(tokens[k]) <= _MAX_ARRAY_TOKEN]
+    if short:
+        # Tokens are lowercased [a-z0-9]+ (see _TOKEN_RE), so one byte per character
+        lens = np.fromiter((len(tokens[k]) for k in short), dtype=np.int64, count=len(short))
+        width = int(lens.max())
+        raw = "".join(tokens[k].ljust(width, "\0") for k in short).encode("ascii")
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(len(short), width).astype(np.uint64)
+        h = np.full(len(short), _FNV_OFFSET, dtype=np.uint64)
+        for col in range(width):
+            h = np.where(lens > col, (h ^ data[:, col]) * _FNV_PRIME, h)
+        out[short] = h
+    for k in new:
+        if len(tokens[k]) > _MAX_ARRAY_TOKEN:
+            out[k] = _hash64(tokens[k])
+    if len(_HASH_MEMO) + len(new) > _HASH_MEMO_MAX:
+        _HASH_MEMO.clear()
+    _HASH_MEMO.update((tokens[k], v) for k, v in zip(new, out[new].tolist()))
+    return out
+
+
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+# The batch path sums votes as 16-bit fields, four to a uint64 word
+_FIELD_SHIFTS = np.arange(4, dtype=np.uint64) * np.uint64(16)
+_MAX_PACKED_TOKENS = (1 << 16) - 1  # longer texts would overflow a field
+
+
+def simhash64_batch(texts: Sequence[str], max_tokens: int = 1 << 20) -> List[int]:
+    """
+    simhash64 for many texts at once, bit-identical to it. The batch's
+    distinct tokens are hashed into a uint64 array (see _hash64_array) and
+    unpacked into 16-bit vote fields, so each text's 64 vote counts are one
+    segment sum over its tokens' rows. Texts are processed max_tokens tokens
+    at a time to bound memory.
+    """
+    out: List[int] = []
+    group: List[List[str]] = []
+    size = 0
+    for text in texts:
+        tokens = _tokenize(text)
+        if group and size + len(tokens) > max_tokens:
+            out.extend(_simhash_token_lists(group))
+            group, size = [], 0
+        group.append(tokens)
+        size += len(tokens)
+    if group:
+        out.extend(_simhash_token_lists(group))
+    return out
+
+
+def _simhash_token_lists(token_lists: List[List[str]]) -> List[int]:
+    out = [0] * len(token_lists)
+    batch = [i for i, tokens in enumerate(token_lists) if 0 < len(tokens) <= _MAX_PACKED_TOKENS]
+    for i, tokens in enumerate(token_lists):
+        if len(tokens) > _MAX_PACKED_TOKENS:
+            out[i] = simhash64_tokens(tokens)
+    if not batch:
+        return out
+
+    flat = [t for i in batch for t in token_lists[i]]
+    vocab = {t: k for k, t in enumerate(dict.fromkeys(flat))}
+    codes = np.fromiter(map(vocab.__getitem__, flat), dtype=np.int64, count=len(flat))
+    hashes = _hash64_array(list(vocab))
+
+    # (vocab, 16): bit 4*w + f of the hash is field f of word w
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    packed = (bits.reshape(-1, 16, 4) << _FIELD_SHIFTS).sum(axis=2, dtype=np.uint64)
+
+    lengths = np.array([len(token_lists[i]) for i in batch], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    summed = np.add.reduceat(packed[codes], starts, axis=0)  # (texts, 16)
+    votes = ((summed[:, :, None] >> _FIELD_SHIFTS) & np.uint64(0xFFFF)).reshape(len(batch), 64)
+
+    # Bit i is set when more tokens have it than lack it
+    set_bits = 2 * votes.astype(np.int64) > lengths[:, None]
+    fps = np.bitwise_or.reduce(set_bits.astype(np.uint64) << _BIT_SHIFTS, axis=1)
+    for i, fp in zip(batch, fps.tolist()):
+        out[i] = fp
+    return out
+
+
+def to_int64(fp: int) -> int:
+    """
+    Unsigned 64-bit fingerprint as the signed value SQLite INTEGER can hold.
+    """
+    return fp - (1 << 64) if fp >= (1 << 63) else fp
+
+
+def from_int64(v: int) -> int:
+    return v + (1 << 64) if v < 0 else v
+
+
 def hamming_distance64(a: int, b: int) -> int:
     return (a ^ b).bit_count()
 
 
+def block_masks(threshold: int, n: int = 0, blocks: Optional[int] = None, max_tables: int = 64) -> List[int]:
+    """
+    Table keys for near-duplicate lookup. The 64 bits are cut into `blocks`
+    contiguous blocks (at least threshold + 1); each table keys on one
+    combination of blocks - threshold of them. Two fingerprints within
+    `threshold` bits differ in at most that many blocks, so they agree on
+    every bit of at least one key (pigeonhole).
+
+    With blocks=None, threshold + 1 blocks are used unless n fingerprints
+    would crowd the keys: blocks are then added (more, wider keys) until a key
+    has about log2(n) + 1 bits or the table count would pass max_tables.
+    """
+    def widths(k: int) -> List[int]:
+        return [64 // k + (1 if i < 64 % k else 0) for i in range(k)]
+
+    def key_bits(k: int) -> int:
+        return sum(sorted(widths(k))[:k - threshold])
+
+    k = blocks if blocks is not None else threshold + 1
+    if blocks is None:
+        need = log2(max(n, 2)) + 1
+        while key_bits(k) < need and k < 64 and comb(k + 1, threshold) <= max_tables:
+            k += 1
+    if not threshold < k <= 64:
+        raise ValueError(f"blocks must be in ({threshold}, 64], got {k}")
+
+    block_bits: List[int] = []
+    shift = 0
+    for w in widths(k):
+        block_bits.append(((1 << w) - 1) << shift)
+        shift += w
+    return [sum(c) for c in combinations(block_bits, k - threshold)]
+
+
+def near_duplicate_pairs(
+    fps: np.ndarray,
+    threshold: int = 3,
+    blocks: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Every pair (i, j), i < j, of uint64 fingerprints within `threshold` bits,
+    as two index arrays sorted by (j, i). Candidates are rows sharing a table
+    key (see block_masks); only they get a vectorized popcount check.
+    """
+    fps = np.asarray(fps, dtype=np.uint64)
+    n = len(fps)
+    found: List[np.ndarray] = []
+    for mask in block_masks(threshold, n, blocks):
+        key = fps & np.uint64(mask)
+        order = np.argsort(key, kind="stable")
+        sk = key[order]
+        # Positions whose d-th successor in sorted order has the same key, d = 1, 2, ...
+        pos = np.flatnonzero(sk[1:] == sk[:-1])
+        d = 1
+        while pos.size:
+            a, b = order[pos], order[pos + d]
+            close = np.bitwise_count(fps[a] ^ fps[b]) <= threshold
+            if close.any():
+                a, b = a[close], b[close]
+                found.append(np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b))
+            d += 1
+            pos = pos[pos + d < n]
+            pos = pos[sk[pos + d] == sk[pos]]
+    if not found:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    packed = np.unique(np.concatenate(found))  # a pair can share several keys
+    i, j = packed // n, packed % n
+    order = np.lexsort((i, j))
+    return i[order], j[order]
+
+
 def dedupe_near_simhash(
+    simhashes: Sequence[int],
+    threshold: int = 3,
+    blocks: Optional[int] = None,
+) -> List[bool]:
+    """
+    Given simhash list, return keep_mask (True=keep, False=drop): an item is
+    dropped when an earlier kept item is within `threshold` bits. Same result
+    as dedupe_near_simhash_pairwise, in about n log n per table instead of
+    n^2: repeated fingerprints are collapsed first, candidate pairs come from
+    near_duplicate_pairs, and only those are walked in order.
+    """
+    n = len(simhashes)
+    if n == 0 or threshold < 0:
+        return [True] * n
+    if threshold >= 64:
+        return [i == 0 for i in range(n)]
+
+    fps = np.fromiter(simhashes, dtype=np.uint64, count=n)
+    # Only the first copy of a fingerprint can survive: any later one is
+    # within 0 bits of it, or of whatever kept item dropped it
+    uniq, first = np.unique(fps, return_index=True)
+    keep = np.zeros(n, dtype=bool)
+    keep[first] = True
+
+    a, b = near_duplicate_pairs(uniq, threshold, blocks)
+    return greedy_keep(keep, first[a], first[b])
+
+
+def greedy_keep(keep: np.ndarray, a: np.ndarray, b: np.ndarray) -> List[bool]:
+    """
+    First-occurrence-wins keep mask from near-duplicate pairs (a[k], b[k]):
+    an item is dropped when a pair links it to an earlier item that is kept.
+    `keep` is the starting mask (False = already dropped).
+    """
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    order = np.lexsort((lo, hi))
+    # By increasing hi, every pair deciding lo has already been seen
+    keep_list = keep.tolist()
+    for x, y in zip(lo[order].tolist(), hi[order].tolist()):
+        if keep_list[x] and keep_list[y]:
+            keep_list[y] = False
+    return keep_list
+
+
+def dedupe_near_simhash_pairwise(
     simhashes: List[int],
     threshold: int = 3,
 ) -> List[bool]:
     """
-    Given simhash list, return keep_mask (True=keep, False=drop).
-    O(n^2) – fine for demo sizes. For huge scale you’d do bucketing/LSH.
+    Reference O(n^2) version of dedupe_near_simhash; for checks on small inputs.
     """
     keep = [True] * len(simhashes)
     for i in range(len(simhashes)):
@@ -0,0 +1,88 @@
+# atlas/eval/near_dup_bench.py
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from atlas.dedupe.simhash import block_masks, dedupe_near_simhash, dedupe_near_simhash_pairwise
+
+
+def synthetic_fingerprints(n: int, dup_rate: float = 0.1, threshold: int = 3, seed: int = 0) -> np.ndarray:
+    """
+    Random 64-bit fingerprints where a dup_rate share are copies of an earlier
+    one with 0..threshold+1 bits flipped (so some fall just outside the threshold).
+    """
+    rng = np.random.default_rng(seed)
+    fps = rng.integers(0, np.iinfo(np.uint64).max, size=n, dtype=np.uint64, endpoint=True)
+    dups = np.flatnonzero(rng.random(n) < dup_rate)
+    dups = dups[dups > 0]
+    fps[dups] = fps[rng.integers(0, dups)]
+    for _ in range(threshold + 1):
+        flip = dups[rng.random(len(dups)) < 0.5]
+        fps[flip] ^= np.left_shift(np.uint64(1), rng.integers(0, 64, size=len(flip)).astype(np.uint64))
+    return fps
+
+
+def run_near_dup_bench(
+    sizes: Sequence[int],
+    out_md: Path,
+    threshold: int = 3,
+    dup_rate: float = 0.1,
+    check_max: int = 10_000,
+) -> Dict[str, Any]:
+    """
+    Time dedupe_near_simhash on synthetic fingerprints of each size. Sizes up
+    to check_max are also run through the O(n^2) reference and must match it.
+    """
+    rows: List[Dict[str, Any]] = []
+    for n in sizes:
+        fps = synthetic_fingerprints(n, dup_rate=dup_rate, threshold=threshold)
+        values = fps.tolist()
+        t0 = time.perf_counter()
+        keep = dedupe_near_simhash(values, threshold=threshold)
+        secs = time.perf_counter() - t0
+
+        row: Dict[str, Any] = {
+            "n": n,
+            "tables": len(block_masks(threshold, n)),
+            "seconds": secs,
+            "kept": sum(keep),
+            "pairwise_seconds": None,
+            "matches_pairwise": None,
+        }
+        if n <= check_max:
+            t0 = time.perf_counter()
+            ref = dedupe_near_simhash_pairwise(values, threshold=threshold)
+            row["pairwise_seconds"] = time.perf_counter() - t0
+            row["matches_pairwise"] = ref == keep
+        rows.append(row)
+
+    stats = {"threshold": threshold, "dup_rate": dup_rate, "runs": rows}
+    out_md.parent.mkdir(parents=True, exist_ok=True)
+    out_md.write_text(_to_markdown(stats), encoding="utf-8")
+    return stats
+
+
+def _to_markdown(stats: Dict[str, Any]) -> str:
+    def f(x: Any) -> str:
+        if x is None:
+            return "-"
+        if isinstance(x, float):
+            return f"{x:.3f}"
+        return str(x)
+
+    lines: List[str] = []
+    lines.append("# Near-Duplicate Dedupe Benchmark\n\n")
+    lines.append(f"- threshold: {stats['threshold']} bits\n")
+    lines.append(f"- synthetic near-duplicate rate: {stats['dup_rate']}\n\n")
+    lines.append("| fingerprints | tables | seconds | kept | pairwise seconds | matches pairwise |\n")
+    lines.append("|---:|---:|---:|---:|---:|:---:|\n")
+    for r in stats["runs"]:
+        lines.append(
+            f"| {r['n']} | {r['tables']} | {f(r['seconds'])} | {r['kept']} "
+            f"| {f(r['pairwise_seconds'])} | {f(r['matches_pairwise'])} |\n"
+        )
+    return "".join(lines)
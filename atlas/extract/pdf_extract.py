@@ -1,16 +1,28 @@
 from __future__ import annotations
+import json
+import os
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import fitz  # PyMuPDF
 import pdfplumber
 
+from atlas.store.extract_cache import file_sha256, get_pages, has_pages, put_pages
+
+
+# Bump when extraction logic changes so cached page text is not reused
+EXTRACTOR_VERSION = 1
+
 
 @dataclass
 class PDFPageText:
     page: int
     text: str
+    engine: str = "pymupdf"
 
 
 @dataclass
@@ -19,60 +31,333 @@ class PDFExtractResult:
     page_count: int
     pages: List[PDFPageText]
     raw_text: str
-    engine: str  # "pymupdf" or "pdfplumber"
+    engine: str  # "pymupdf", "pdfplumber", or "pymupdf+pdfplumber" when only some pages fell back
+
+
+def pdf_page_count(pdf_path: Path) -> int:
+    with fitz.open(str(pdf_path)) as doc:
+        return doc.page_count
+
+
+def page_ranges(page_count: int, range_pages: int) -> List[Tuple[int, int]]:
+    """
+    Split [0, page_count) into consecutive 0-based [start, end) ranges.
+    """
+    step = max(1, range_pages)
+    return [(s, min(page_count, s + step)) for s in range(0, page_count, step)]
 
 
-def _extract_with_pymupdf(pdf_bytes: bytes, source_uri: str) -> PDFExtractResult:
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+def _pymupdf_pages(doc: "fitz.Document", start: int, end: int) -> List[PDFPageText]:
     pages: List[PDFPageText] = []
-    for i in range(doc.page_count):
+    for i in range(start, end):
         page = doc.load_page(i)
         t = page.get_text("text") or ""
         pages.append(PDFPageText(page=i + 1, text=t))
+    return pages
+
+
+def _extract_with_pymupdf(pdf_path: Path, start: int = 0, end: Optional[int] = None) -> List[PDFPageText]:
+    # Open by path: PyMuPDF reads pages on demand instead of us copying the file into memory
+    with fitz.open(str(pdf_path)) as doc:
+        end = doc.page_count if end is None else min(end, doc.page_count)
+        return _pymupdf_pages(doc, start, end)
+
+
+def _extract_pages_with_pdfplumber(pdf_path: Path, page_numbers: Iterable[int]) -> Dict[int, str]:
+    """
+    Extract only the given 1-based pages with pdfplumber.
+    """
+    out: Dict[int, str] = {}
+    with pdfplumber.open(str(pdf_path)) as pdf:
+        for n in page_numbers:
+            if 1 <= n <= len(pdf.pages):
+                out[n] = pdf.pages[n - 1].extract_text() or ""
+    return out
+
+
+def _fill_weak_pages(pdf_path: Path, pages: List[PDFPageText], weak: List[int]) -> None:
+    # Re-extract the given pages with pdfplumber; the longer text wins per page
+    if not weak:
+        return
+    try:
+        retry = _extract_pages_with_pdfplumber(pdf_path, weak)
+    except Exception:
+        return
+    for p in pages:
+        t = retry.get(p.page)
+        if t is not None and len(t.strip()) > len(p.text.strip()):
+            p.text = t
+            p.engine = "pdfplumber"
+
+
+def extract_page_range(
+    pdf_path: Path,
+    start: int,
+    end: int,
+    fallback_page_chars: int = 20,
+) -> List[PDFPageText]:
+    """
+    Extract 0-based pages [start, end) with per-page pdfplumber fallback.
+    Safe to run in parallel: each call opens the file independently.
+    """
+    pages = _extract_with_pymupdf(pdf_path, start, end)
+    _fill_weak_pages(pdf_path, pages, [p.page for p in pages if len(p.text.strip()) < fallback_page_chars])
+    return pages
+
+
+def assemble_pdf_result(
+    pdf_path: Path,
+    pages: List[PDFPageText],
+    fallback_if_short_chars: int = 800,
+) -> PDFExtractResult:
+    """
+    Build a PDFExtractResult from page-ordered pages (e.g. concatenated ranges).
+    If the whole document is still under fallback_if_short_chars, every page
+    PyMuPDF kept is re-checked with pdfplumber.
+    """
+    if sum(len(p.text.strip()) for p in pages) < fallback_if_short_chars:
+        _fill_weak_pages(pdf_path, pages, [p.page for p in pages if p.engine == "pymupdf"])
     raw = "\n\n".join(p.text for p in pages).strip()
     return PDFExtractResult(
-        source_uri=source_uri,
-        page_count=doc.page_count,
+        source_uri=str(pdf_path),
+        page_count=len(pages),
         pages=pages,
         raw_text=raw,
-        engine="pymupdf",
+        engine=_summarize_engine(pages),
     )
 
 
-def _extract_with_pdfplumber(pdf_path: Path, source_uri: str) -> PDFExtractResult:
-    pages: List[PDFPageText] = []
-    with pdfplumber.open(str(pdf_path)) as pdf:
-        for i, p in enumerate(pdf.pages, start=1):
-            t = p.extract_text() or ""
-            pages.append(PDFPageText(page=i, text=t))
-        raw = "\n\n".join(pp.text for pp in pages).strip()
-        return PDFExtractResult(
-            source_uri=source_uri,
-            page_count=len(pdf.pages),
-            pages=pages,
-            raw_text=raw,
-            engine="pdfplumber",
-        )
+def _summarize_engine(pages: Iterable[PDFPageText]) -> str:
+    return summarize_engines({p.engine for p in pages})
+
+
+def summarize_engines(engines: set[str]) -> str:
+    """
+    Document-level engine from the set of per-page engines.
+    """
+    if len(engines) > 1:
+        return "pymupdf+pdfplumber"
+    return engines.pop() if engines else "pymupdf"
 
 
 def extract_pdf(
     pdf_path: Path,
     fallback_if_short_chars: int = 800,
+    fallback_page_chars: int = 20,
+    max_workers: int = 1,
+    split_min_pages: int = 400,
+    range_pages: int = 200,
 ) -> PDFExtractResult:
     """
-    Extract text from PDF. Uses PyMuPDF first; falls back to pdfplumber if extraction is too short.
+    Extract text from PDF. Uses PyMuPDF for every page, then re-extracts with
+    pdfplumber only the pages where PyMuPDF found less than fallback_page_chars
+    characters (every page if the whole document is under fallback_if_short_chars).
+    The longer text wins per page.
+
+    With max_workers > 1, documents of at least split_min_pages pages are split
+    into range_pages-sized ranges extracted by a process pool, then reassembled
+    in page order.
     """
-    pdf_bytes = pdf_path.read_bytes()
-    first = _extract_with_pymupdf(pdf_bytes, source_uri=str(pdf_path))
+    if max_workers > 1:
+        page_count = pdf_page_count(pdf_path)
+        if page_count >= split_min_pages:
+            ranges = page_ranges(page_count, range_pages)
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(ranges))) as pool:
+                parts = pool.map(
+                    extract_page_range,
+                    [pdf_path] * len(ranges),
+                    [s for s, _ in ranges],
+                    [e for _, e in ranges],
+                    [fallback_page_chars] * len(ranges),
+                )
+                pages = [p for part in parts for p in part]
+            return assemble_pdf_result(pdf_path, pages, fallback_if_short_chars)
+
+    pages = list(iter_pdf_pages(pdf_path, fallback_if_short_chars, fallback_page_chars))
+    raw = "\n\n".join(p.text for p in pages).strip()
+    return PDFExtractResult(
+        source_uri=str(pdf_path),
+        page_count=len(pages),
+        pages=pages,
+        raw_text=raw,
+        engine=_summarize_engine(pages),
+    )
+
 
-    # Fallback heuristic: if almost empty, try pdfplumber
-    if len(first.raw_text) < fallback_if_short_chars:
-        try:
-            second = _extract_with_pdfplumber(pdf_path, source_uri=str(pdf_path))
-            # Use whichever is better
-            if len(second.raw_text) > len(first.raw_text):
-                return second
-        except Exception:
-            pass
+def iter_pdf_pages(
+    pdf_path: Path,
+    fallback_if_short_chars: int = 800,
+    fallback_page_chars: int = 20,
+    window: int = 32,
+) -> Iterator[PDFPageText]:
+    """
+    Lazy extract_pdf: yields the same pages in order, extracting `window`
+    pages at a time (one pdfplumber open per window with weak pages).
+    Pages are held back only while the document is still under
+    fallback_if_short_chars, because until then every page may yet need the
+    whole-document pdfplumber re-check.
+    """
+    held: List[PDFPageText] = []
+    total = 0
+    with fitz.open(str(pdf_path)) as doc:
+        n = doc.page_count
+        for start in range(0, n, max(1, window)):
+            pages = _pymupdf_pages(doc, start, min(n, start + max(1, window)))
+            total += sum(len(p.text.strip()) for p in pages)
+            if total < fallback_if_short_chars:
+                held.extend(pages)
+                continue
+            if held:
+                pages = held + pages
+                held = []
+            _fill_weak_pages(pdf_path, pages, [p.page for p in pages if len(p.text.strip()) < fallback_page_chars])
+            yield from pages
 
-    return first
+    if held:
+        _fill_weak_pages(pdf_path, held, [p.page for p in held])
+        yield from held
+
+
+class PageSpool:
+    """
+    Append-only, re-iterable sequence of PDFPageText. Pages are zlib-compressed
+    and spill to a temporary file past max_memory bytes, so a document can be
+    read twice (e.g. header/footer detection, then cleaning) without keeping
+    its text in memory.
+    """
+
+    def __init__(self, max_memory: int = 4 << 20) -> None:
+        self._f = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self.count = 0
+
+    def append(self, page: PDFPageText) -> None:
+        blob = zlib.compress(json.dumps([page.page, page.text, page.engine], ensure_ascii=False).encode("utf-8"), 1)
+        self._f.seek(0, os.SEEK_END)
+        self._f.write(len(blob).to_bytes(4, "little"))
+        self._f.write(blob)
+        self.count += 1
+
+    def __iter__(self) -> Iterator[PDFPageText]:
+        pos = 0
+        for _ in range(self.count):
+            self._f.seek(pos)
+            size = int.from_bytes(self._f.read(4), "little")
+            n, t, e = json.loads(zlib.decompress(self._f.read(size)).decode("utf-8"))
+            pos += 4 + size
+            yield PDFPageText(page=n, text=t, engine=e)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "PageSpool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def extraction_cache_key(
+    sha256: str,
+    fallback_if_short_chars: int = 800,
+    fallback_page_chars: int = 20,
+) -> str:
+    """
+    Cache key for a file's extracted pages: content hash plus everything that
+    can change the output (engine versions, fallback settings, our own logic).
+    """
+    return "|".join([
+        sha256,
+        f"pymupdf={fitz.VersionBind}",
+        f"pdfplumber={pdfplumber.__version__}",
+        f"fallback={fallback_if_short_chars},{fallback_page_chars}",
+        f"atlas={EXTRACTOR_VERSION}",
+    ])
+
+
+def load_cached_extraction(
+    pdf_path: Path,
+    cache_db: Path,
+    fallback_if_short_chars: int = 800,
+    fallback_page_chars: int = 20,
+) -> tuple[str, Optional[PDFExtractResult]]:
+    """
+    Returns (cache_key, result or None on a miss).
+    """
+    key, hit = load_cached_pages(pdf_path, cache_db, fallback_if_short_chars, fallback_page_chars)
+    if hit is None:
+        return key, None
+    engine, pages = hit
+    return key, PDFExtractResult(
+        source_uri=str(pdf_path),
+        page_count=len(pages),
+        pages=pages,
+        raw_text="\n\n".join(p.text for p in pages).strip(),
+        engine=engine,
+    )
+
+
+def load_cached_pages(
+    pdf_path: Path,
+    cache_db: Path,
+    fallback_if_short_chars: int = 800,
+    fallback_page_chars: int = 20,
+    sha256: Optional[str] = None,
+) -> tuple[str, Optional[tuple[str, List[PDFPageText]]]]:
+    """
+    Returns (cache_key, (engine, pages) or None on a miss), without building raw_text.
+    Pass sha256 when the content hash is already known (e.g. from a capture
+    manifest) to key the lookup on it instead of hashing the file.
+    """
+    sha256 = sha256 or file_sha256(cache_db, pdf_path)
+    key = extraction_cache_key(sha256, fallback_if_short_chars, fallback_page_chars)
+    hit = get_pages(cache_db, key)
+    if hit is None:
+        return key, None
+    engine, rows = hit
+    return key, (engine, [PDFPageText(page=n, text=t, engine=e) for n, t, e in rows])
+
+
+def is_extraction_cached(
+    pdf_path: Path,
+    cache_db: Path,
+    fallback_if_short_chars: int = 800,
+    fallback_page_chars: int = 20,
+    sha256: Optional[str] = None,
+) -> bool:
+    """
+    Whether load_cached_pages would hit, checked by key only.
+    """
+    sha256 = sha256 or file_sha256(cache_db, pdf_path)
+    key = extraction_cache_key(sha256, fallback_if_short_chars, fallback_page_chars)
+    return has_pages(cache_db, key)
+
+
+def store_cached_extraction(cache_db: Path, cache_key: str, result: PDFExtractResult) -> None:
+    store_cached_pages(cache_db, cache_key, result.engine, result.pages)
+
+
+def store_cached_pages(cache_db: Path, cache_key: str, engine: str, pages: Iterable[PDFPageText]) -> None:
+    put_pages(cache_db, cache_key, engine, ((p.page, p.text, p.engine) for p in pages))
+
+
+def extract_pdf_cached(
+    pdf_path: Path,
+    cache_db: Path,
+    fallback_if_short_chars: int = 800,
+    fallback_page_chars: int = 20,
+    **kwargs,
+) -> PDFExtractResult:
+    """
+    extract_pdf with a persistent per-page cache keyed by extraction_cache_key.
+    A hit skips PyMuPDF/pdfplumber entirely; unchanged files are recognised by
+    size/mtime without being re-hashed.
+    """
+    key, result = load_cached_extraction(pdf_path, cache_db, fallback_if_short_chars, fallback_page_chars)
+    if result is not None:
+        return result
+    result = extract_pdf(pdf_path, fallback_if_short_chars, fallback_page_chars, **kwargs)
+    store_cached_extraction(cache_db, key, result)
+    return result
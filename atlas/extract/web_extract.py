@@ -1,26 +1,168 @@
 from __future__ import annotations
+import re
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional, Tuple
+
+import lxml.html
 import trafilatura
 
 
+# Speed/quality knob for extract_main_text:
+#   "recall"   - always full trafilatura (favor_recall); slowest, best recall
+#   "balanced" - fast lxml pass, trafilatura only when it fails the quality gate
+#   "fast"     - fast lxml pass, trafilatura only when it finds nothing at all
+EXTRACT_MODES = ("recall", "balanced", "fast")
+
+# Removed before the fast pass looks for content
+_BOILERPLATE_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "svg", "canvas", "form",
+    "nav", "header", "footer", "aside", "button", "select",
+)
+_BLOCK_TAGS = ("p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "pre", "blockquote", "dd", "dt")
+# Elements whose start and end break the text into separate blocks
+_BREAK_TAGS = frozenset(_BLOCK_TAGS + (
+    "div", "section", "article", "main", "body", "ul", "ol", "dl", "table", "tr", "td", "th",
+    "figure", "figcaption", "br", "hr",
+))
+
+# Pre-check: markup that is never visible, and tags
+_INVISIBLE = re.compile(r"<(script|style|noscript|template)\b.*?</\1\s*>|<!--.*?-->", re.I | re.S)
+_TAG = re.compile(r"<[^>]*>")
+
+
 @dataclass
 class WebExtractResult:
     source_uri: str
     title: Optional[str]
     raw_text: str
+    engine: str = "trafilatura"  # tier that produced raw_text: "empty", "plain", "lxml" or "trafilatura"
 
 
-def extract_main_text(url: str, html: str) -> WebExtractResult:
-    """
-    Extract main content text from HTML using trafilatura.
-    """
+@dataclass
+class FastExtract:
+    text: str
+    link_density: float  # share of the content's characters inside <a>
+
+
+def _trafilatura_text(html: str) -> str:
     downloaded = trafilatura.extract(
         html,
         include_comments=False,
         include_tables=False,
         favor_recall=True,
     )
-    text = downloaded or ""
+    return (downloaded or "").strip()
+
+
+def _content_root(root: lxml.html.HtmlElement) -> lxml.html.HtmlElement:
+    for xp in ("//article", "//main", "//*[@role='main']"):
+        found = root.xpath(xp)
+        if found:
+            # Several <article>s (listing pages): take the one with the most text
+            return max(found, key=lambda el: len(el.text_content()))
+    body = root.find("body")
+    return body if body is not None else root
+
+
+def fast_extract(html: str) -> Optional[FastExtract]:
+    """
+    Cheap main-content pass with lxml: drop boilerplate elements, pick
+    <article>/<main> (else <body>), and keep all of its text, one line per
+    block: a container's own text, nested blocks and loose text between
+    blocks each get their own line. Returns None if the HTML cannot be parsed.
+    """
+    try:
+        root = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return None
+    # Comments go too; drop_tree keeps their tail text in the parent
+    for el in root.xpath("|".join(f"//{t}" for t in _BOILERPLATE_TAGS) + "|//comment()|//processing-instruction()"):
+        el.drop_tree()
+
+    content = _content_root(root)
+    blocks: List[str] = []
+    current: List[str] = []
+    link_chars = 0
+
+    def flush() -> None:
+        t = " ".join(" ".join(current).split())
+        if t:
+            blocks.append(t)
+        current.clear()
+
+    # Each element's own text on "start", its tail (text after it, inside the parent) on "end"
+    for event, el in lxml.etree.iterwalk(content, events=("start", "end")):
+        tag = el.tag.lower()
+        if tag in _BREAK_TAGS:
+            flush()
+        if event == "start":
+            if el.text:
+                current.append(el.text)
+            if tag == "a":
+                link_chars += len(" ".join(el.text_content().split()))
+        elif el is not content and el.tail:
+            current.append(el.tail)
+    flush()
+
+    text = "\n".join(blocks)
+    return FastExtract(text=text, link_density=(link_chars / len(text)) if text else 0.0)
+
+
+def passes_quality(fx: FastExtract, min_chars: int, max_link_density: float) -> bool:
+    return len(fx.text) >= min_chars and fx.link_density <= max_link_density
+
+
+def visible_chars(html: str) -> int:
+    """
+    Rough count of non-space characters a browser would show: scripts,
+    styles, comments and tags are cut with regexes, no parsing.
+    """
+    return sum(len(w) for w in _TAG.sub(" ", _INVISIBLE.sub(" ", html)).split())
+
+
+def _precheck(html: str, content_kind: Optional[str], min_visible_chars: int) -> Optional[Tuple[str, str]]:
+    # Returns (engine, text) when no HTML extraction is needed
+    if not html or not html.strip():
+        return "empty", ""
+    if content_kind == "text":
+        return "plain", html.strip()
+    if visible_chars(html) < min_visible_chars:
+        return "empty", ""  # near-empty: error stubs, redirect shells, blank templates
+    return None
+
+
+def extract_main_text(
+    url: str,
+    html: str,
+    mode: str = "recall",
+    content_kind: Optional[str] = None,
+    min_chars: int = 500,
+    max_link_density: float = 0.4,
+    min_visible_chars: int = 25,
+) -> WebExtractResult:
+    """
+    Extract main content text from HTML. Empty bodies and text/plain responses
+    are returned as-is, and pages with fewer than min_visible_chars visible
+    characters as empty; otherwise the tier used depends on `mode` (see
+    EXTRACT_MODES). In "balanced" mode the fast lxml result is kept when it has
+    at least min_chars characters and at most max_link_density link text.
+    The tier that produced the text is recorded in `engine`.
+    """
+    if mode not in EXTRACT_MODES:
+        raise ValueError(f"Unknown web extract mode: {mode!r} (expected one of {', '.join(EXTRACT_MODES)})")
+
+    pre = _precheck(html, content_kind, min_visible_chars)
+    if pre is not None:
+        engine, text = pre
+        return WebExtractResult(source_uri=url, title=None, raw_text=text, engine=engine)
+
+    if mode != "recall":
+        fx = fast_extract(html)
+        if fx is not None:
+            if mode == "fast" and fx.text:
+                return WebExtractResult(source_uri=url, title=None, raw_text=fx.text, engine="lxml")
+            if mode == "balanced" and passes_quality(fx, min_chars, max_link_density):
+                return WebExtractResult(source_uri=url, title=None, raw_text=fx.text, engine="lxml")
+
     # trafilatura has metadata extraction but keep simple
-    return WebExtractResult(source_uri=url, title=None, raw_text=text.strip())
+    return WebExtractResult(source_uri=url, title=None, raw_text=_trafilatura_text(html), engine="trafilatura")
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Dict, Iterator, Optional
+
+try:
+    import zstandard  # optional; falls back to gzip
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+_CODEC_EXT = {"zstd": ".zst", "gzip": ".gz"}
+
+
+@dataclass
+class CaptureEntry:
+    url: str
+    sha256: str
+    kind: str  # "html", "text" or "pdf"
+    size: int
+    captured_at: str
+    encoding: Optional[str] = None  # charset of an html/text payload, when known
+
+
+class CaptureStore:
+    """
+    Content-addressed store for raw fetched bodies.
+
+    Layout under root:
+      objects/ab/cdef....zst|.gz   compressed payload, named by SHA-256 of the raw bytes
+      manifest.jsonl               append-only URL -> hash records (latest per URL wins)
+
+    Identical payloads fetched from different URLs are stored once.
+    """
+
+    def __init__(self, root: Path, codec: Optional[str] = None) -> None:
+        if codec is None:
+            codec = "zstd" if zstandard is not None else "gzip"
+        if codec not in _CODEC_EXT:
+            raise ValueError(f"Unknown capture codec: {codec}")
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("zstd capture codec requires the 'zstandard' package")
+        self.root = root
+        self.codec = codec
+        self.objects_dir = root / "objects"
+        self.manifest_path = root / "manifest.jsonl"
+        self._manifest: Optional[IO[str]] = None
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+    def __enter__(self) -> "CaptureStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._manifest is not None:
+            self._manifest.close()
+            self._manifest = None
+
+    def _object_path(self, digest: str, codec: str) -> Path:
+        return self.objects_dir / digest[:2] / (digest[2:] + _CODEC_EXT[codec])
+
+    def find(self, digest: str) -> Optional[Path]:
+        for codec in _CODEC_EXT:
+            p = self._object_path(digest, codec)
+            if p.exists():
+                return p
+        return None
+
+    def _open_compressed_write(self, path: Path) -> IO[bytes]:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=10).stream_writer(path.open("wb"), closefd=True)
+        return gzip.open(path, "wb", compresslevel=6)
+
+    def _open_decompressed_read(self, path: Path) -> IO[bytes]:
+        if path.suffix == ".zst":
+            if zstandard is None:
+                raise RuntimeError(f"{path} is zstd-compressed; install 'zstandard' to read it")
+            return zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+        return gzip.open(path, "rb")
+
+    def _write_object(self, digest: str, src: IO[bytes]) -> None:
+        out_path = self._object_path(digest, self.codec)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = out_path.with_name(out_path.name + ".part")
+        try:
+            with self._open_compressed_write(tmp_path) as f:
+                shutil.copyfileobj(src, f, 1 << 20)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_path, out_path)
+
+    def put_bytes(self, data: bytes) -> str:
+        """
+        Store a payload; returns its SHA-256. No-op if already stored.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if self.find(digest) is None:
+            self._write_object(digest, io.BytesIO(data))
+        return digest
+
+    def put_file(self, path: Path) -> str:
+        """
+        Store a file without loading it into memory; returns its SHA-256.
+        """
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        if self.find(digest) is None:
+            with path.open("rb") as f:
+                self._write_object(digest, f)
+        return digest
+
+    def get_bytes(self, digest: str) -> bytes:
+        p = self.find(digest)
+        if p is None:
+            raise KeyError(digest)
+        with self._open_decompressed_read(p) as f:
+            return f.read()
+
+    def copy_to(self, digest: str, dest: Path) -> Path:
+        """
+        Decompress a stored payload to dest, streaming.
+        """
+        p = self.find(digest)
+        if p is None:
+            raise KeyError(digest)
+        with self._open_decompressed_read(p) as src, dest.open("wb") as out:
+            shutil.copyfileobj(src, out, 1 << 20)
+        return dest
+
+    def record(
+        self,
+        url: str,
+        digest: str,
+        kind: str,
+        size: int,
+        captured_at: str,
+        encoding: Optional[str] = None,
+    ) -> None:
+        if self._manifest is None:
+            self._manifest = self.manifest_path.open("a", encoding="utf-8")
+        entry = {"url": url, "sha256": digest, "kind": kind, "size": size, "captured_at": captured_at}
+        if encoding is not None:
+            entry["encoding"] = encoding
+        self._manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def iter_manifest(self) -> Iterator[CaptureEntry]:
+        """
+        Latest entry per URL, in first-capture order.
+        """
+        if self._manifest is not None:
+            self._manifest.flush()
+        if not self.manifest_path.exists():
+            return
+        latest: Dict[str, CaptureEntry] = {}
+        with self.manifest_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    d = json.loads(line)
+                    latest[d["url"]] = CaptureEntry(**d)
+        yield from latest.values()
@@ -0,0 +1,168 @@
+from __future__ import annotations
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from atlas.dedupe.simhash import block_masks
+
+
+# Queries are matched against the index this many at a time (bounds temp tables and memory)
+_BATCH = 20_000
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    con = sqlite3.connect(str(db_path), timeout=60)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; a crash loses at most the last run's additions
+    con.execute("PRAGMA cache_size=-262144")  # 256 MiB of page cache for bulk inserts into the B-trees
+    return con
+
+
+def init_dedupe_index(db_path: Path, threshold: int = 3, blocks: Optional[int] = None) -> None:
+    """
+    Persistent dedupe state for an output directory: the exact hashes and
+    SimHash fingerprints of every chunk kept so far.
+
+    - exact_hashes: SHA-256 digests as 32-byte blobs, one clustered B-tree.
+    - simhash_bands: one row per (table, key, fingerprint) for the block
+      tables of block_masks(threshold, blocks=...), clustered by (band, key),
+      so a lookup reads only its buckets.
+
+    The block layout is fixed when the index is created (blocks defaults to
+    threshold + 2: 10 tables with 25-bit keys at threshold 3, small buckets
+    past 100M fingerprints). It supports lookups at any threshold up to the
+    one it was built for.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    con = _connect(db_path)
+    cur = con.cursor()
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS dedupe_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS exact_hashes (
+        hash BLOB PRIMARY KEY
+    ) WITHOUT ROWID
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS simhash_bands (
+        band INTEGER NOT NULL,
+        key INTEGER NOT NULL,
+        simhash64 INTEGER NOT NULL,
+        PRIMARY KEY (band, key, simhash64)
+    ) WITHOUT ROWID
+    """)
+
+    blocks = blocks if blocks is not None else threshold + 2
+    cur.executemany(
+        "INSERT OR IGNORE INTO dedupe_meta(key, value) VALUES(?,?)",
+        [("threshold", str(threshold)), ("blocks", str(blocks))],
+    )
+    con.commit()
+    con.close()
+
+
+def _layout(con: sqlite3.Connection) -> Tuple[int, List[int]]:
+    meta = dict(con.execute("SELECT key, value FROM dedupe_meta").fetchall())
+    threshold = int(meta["threshold"])
+    return threshold, block_masks(threshold, blocks=int(meta["blocks"]))
+
+
+def index_threshold(db_path: Path) -> int:
+    """
+    Largest near-duplicate threshold the index can answer.
+    """
+    con = _connect(db_path)
+    threshold, _ = _layout(con)
+    con.close()
+    return threshold
+
+
+def _batches(n: int) -> Iterable[Tuple[int, int]]:
+    return ((s, min(n, s + _BATCH)) for s in range(0, n, _BATCH))
+
+
+def seen_exact_hashes(db_path: Path, hashes: Sequence[str]) -> Set[str]:
+    """
+    The given hex SHA-256 digests that are already in the index.
+    """
+    con = _connect(db_path)
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS q_hash (hash BLOB)")
+    seen: Set[str] = set()
+    for s, e in _batches(len(hashes)):
+        con.execute("DELETE FROM q_hash")
+        con.executemany("INSERT INTO q_hash(hash) VALUES(?)", [(bytes.fromhex(h),) for h in hashes[s:e]])
+        rows = con.execute("SELECT DISTINCT q.hash FROM q_hash q JOIN exact_hashes x ON x.hash = q.hash")
+        seen.update(r[0].hex() for r in rows)
+    con.close()
+    return seen
+
+
+def near_seen(db_path: Path, simhashes: Sequence[int], threshold: int = 3) -> List[bool]:
+    """
+    For each fingerprint, whether the index holds one within `threshold`
+    bits. Every query's block-table keys are joined against simhash_bands in
+    SQLite; the candidates that come back get a vectorized popcount check.
+    """
+    con = _connect(db_path)
+    index_threshold, masks = _layout(con)
+    if threshold > index_threshold:
+        con.close()
+        raise ValueError(f"dedupe index was built for threshold <= {index_threshold}, got {threshold}")
+
+    con.execute("CREATE TEMP TABLE IF NOT EXISTS q_band (qid INTEGER, band INTEGER, key INTEGER)")
+    seen = np.zeros(len(simhashes), dtype=bool)
+    for s, e in _batches(len(simhashes)):
+        fps = np.fromiter(simhashes[s:e], dtype=np.uint64, count=e - s)
+        con.execute("DELETE FROM q_band")
+        con.executemany(
+            "INSERT INTO q_band(qid, band, key) VALUES(?,?,?)",
+            [
+                (qid, band, key)
+                for band, mask in enumerate(masks)
+                for qid, key in enumerate((fps & np.uint64(mask)).view(np.int64).tolist())
+            ],
+        )
+        rows = con.execute("""
+        SELECT DISTINCT q.qid, b.simhash64 FROM q_band q
+        JOIN simhash_bands b ON b.band = q.band AND b.key = q.key
+        """).fetchall()
+        if not rows:
+            continue
+        qid = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        cand = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows)).view(np.uint64)
+        close = np.bitwise_count(fps[qid] ^ cand) <= threshold
+        seen[s + qid[close]] = True
+    con.close()
+    return seen.tolist()
+
+
+def add_to_dedupe_index(db_path: Path, hashes: Iterable[str], simhashes: Iterable[int]) -> None:
+    """
+    Record kept chunks' exact hashes and fingerprints (existing ones are ignored).
+    """
+    con = _connect(db_path)
+    _, masks = _layout(con)
+    con.executemany(
+        "INSERT OR IGNORE INTO exact_hashes(hash) VALUES(?)",
+        ((bytes.fromhex(h),) for h in hashes if h),
+    )
+    fps = np.unique(np.fromiter(simhashes, dtype=np.uint64))
+    for band, mask in enumerate(masks):
+        keys = fps & np.uint64(mask)
+        # Key order, so the B-tree is filled front to back; int64 views are the to_int64 values
+        order = np.lexsort((fps.view(np.int64), keys.view(np.int64)))
+        con.executemany(
+            "INSERT OR IGNORE INTO simhash_bands(band, key, simhash64) VALUES(?,?,?)",
+            zip([band] * len(order), keys[order].view(np.int64).tolist(), fps[order].view(np.int64).tolist()),
+        )
+    con.commit()
+    con.close()
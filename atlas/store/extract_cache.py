@@ -0,0 +1,115 @@
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    # Several extraction workers may share the cache; wait on locks instead of failing
+    con = sqlite3.connect(str(db_path), timeout=60)
+    con.execute("PRAGMA journal_mode=WAL")
+    return con
+
+
+def init_extract_cache(db_path: Path) -> None:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    con = _connect(db_path)
+    cur = con.cursor()
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sha256 TEXT NOT NULL
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS extractions (
+        cache_key TEXT PRIMARY KEY,
+        engine TEXT NOT NULL,
+        page_count INTEGER NOT NULL,
+        pages BLOB NOT NULL
+    )
+    """)
+    con.commit()
+    con.close()
+
+
+def file_sha256(db_path: Path, path: Path) -> str:
+    """
+    SHA-256 of a file's bytes. Reuses the stored hash when size and mtime are
+    unchanged, so unchanged files are not re-read on every run.
+    """
+    st = path.stat()
+    key = str(path.resolve())
+    con = _connect(db_path)
+    row = con.execute("SELECT size, mtime_ns, sha256 FROM files WHERE path=?", (key,)).fetchone()
+    if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+        con.close()
+        return row[2]
+
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    con.execute("""
+    INSERT INTO files(path, size, mtime_ns, sha256) VALUES(?,?,?,?)
+    ON CONFLICT(path) DO UPDATE SET
+        size=excluded.size,
+        mtime_ns=excluded.mtime_ns,
+        sha256=excluded.sha256
+    """, (key, st.st_size, st.st_mtime_ns, digest))
+    con.commit()
+    con.close()
+    return digest
+
+
+def get_pages(db_path: Path, cache_key: str) -> Optional[Tuple[str, List[Tuple[int, str, str]]]]:
+    """
+    Returns (engine, [(page, text, page_engine), ...]) or None on a miss.
+    """
+    con = _connect(db_path)
+    row = con.execute("SELECT engine, pages FROM extractions WHERE cache_key=?", (cache_key,)).fetchone()
+    con.close()
+    if row is None:
+        return None
+    pages = [tuple(p) for p in json.loads(zlib.decompress(row[1]).decode("utf-8"))]
+    return row[0], pages
+
+
+def has_pages(db_path: Path, cache_key: str) -> bool:
+    """
+    Whether pages are cached under cache_key, without reading them.
+    """
+    con = _connect(db_path)
+    row = con.execute("SELECT 1 FROM extractions WHERE cache_key=?", (cache_key,)).fetchone()
+    con.close()
+    return row is not None
+
+
+def put_pages(db_path: Path, cache_key: str, engine: str, pages: Iterable[Tuple[int, str, str]]) -> None:
+    # Compressed as it is serialized, so a page iterator is never materialized as one JSON string
+    z = zlib.compressobj(6)
+    parts = [z.compress(b"[")]
+    count = 0
+    for p in pages:
+        sep = b", " if count else b""
+        parts.append(z.compress(sep + json.dumps(list(p), ensure_ascii=False).encode("utf-8")))
+        count += 1
+    parts.append(z.compress(b"]"))
+    parts.append(z.flush())
+    blob = b"".join(parts)
+
+    con = _connect(db_path)
+    con.execute(
+        "INSERT OR REPLACE INTO extractions(cache_key, engine, page_count, pages) VALUES(?,?,?,?)",
+        (cache_key, engine, count, blob),
+    )
+    con.commit()
+    con.close()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import json
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    updated_at: Optional[str] = None
+    outlinks: Optional[List[str]] = None  # links on the page, stored for link-following crawls
+
+
+def init_http_cache(db_path: Path) -> None:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(db_path))
+    cur = con.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS http_cache (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        content_hash TEXT,
+        updated_at TEXT,
+        outlinks TEXT  -- JSON list of the page's links; NULL when not recorded
+    )
+    """)
+
+    # Databases created before outlinks were stored
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(http_cache)")}
+    if "outlinks" not in cols:
+        cur.execute("ALTER TABLE http_cache ADD COLUMN outlinks TEXT")
+    con.commit()
+    con.close()
+
+
+def load_cache_entries(db_path: Path, require_outlinks: bool = False) -> Dict[str, CacheEntry]:
+    """
+    Load all cached validators into memory, keyed by URL.
+    One bulk read is far cheaper than a query per fetch.
+
+    Outlinks are left in the database (see load_outlinks). With
+    require_outlinks, only URLs whose links were stored are returned, so a
+    link-following crawl fetches the others in full instead of getting a
+    304 it cannot follow.
+    """
+    if not db_path.exists():
+        return {}
+    con = sqlite3.connect(str(db_path))
+    cur = con.cursor()
+    sql = "SELECT url, etag, last_modified, content_hash, updated_at FROM http_cache"
+    if require_outlinks:
+        sql += " WHERE outlinks IS NOT NULL"
+    rows = cur.execute(sql).fetchall()
+    con.close()
+    return {r[0]: CacheEntry(*r) for r in rows}
+
+
+def load_outlinks(db_path: Path, url: str) -> Optional[List[str]]:
+    """
+    Links stored with a URL's validators, or None if none were recorded.
+    """
+    con = sqlite3.connect(str(db_path))
+    row = con.execute("SELECT outlinks FROM http_cache WHERE url=?", (url,)).fetchone()
+    con.close()
+    if row is None or row[0] is None:
+        return None
+    return json.loads(row[0])
+
+
+def save_cache_entries(db_path: Path, entries: Iterable[CacheEntry]) -> None:
+    con = sqlite3.connect(str(db_path))
+    cur = con.cursor()
+    cur.executemany("""
+    INSERT INTO http_cache(url, etag, last_modified, content_hash, updated_at, outlinks)
+    VALUES(?,?,?,?,?,?)
+    ON CONFLICT(url) DO UPDATE SET
+        etag=excluded.etag,
+        last_modified=excluded.last_modified,
+        content_hash=excluded.content_hash,
+        updated_at=excluded.updated_at,
+        outlinks=excluded.outlinks
+    """, [
+        (e.url, e.etag, e.last_modified, e.content_hash, e.updated_at,
+         json.dumps(e.outlinks, ensure_ascii=False) if e.outlinks is not None else None)
+        for e in entries
+    ])
+    con.commit()
+    con.close()
+
+
+def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+    """
+    Build If-None-Match / If-Modified-Since headers from a cache entry.
+    """
+    headers: Dict[str, str] = {}
+    if entry is None:
+        return headers
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
@@ -1,26 +1,12 @@
 from __future__ import annotations
 import sqlite3
 from pathlib import Path
-from typing import Dict, Any, Iterable, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 
+from atlas.dedupe.simhash import from_int64, to_int64
 
-def init_db(db_path: Path) -> None:
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    con = sqlite3.connect(str(db_path))
-    cur = con.cursor()
 
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS docs (
-        doc_id TEXT PRIMARY KEY,
-        source_type TEXT NOT NULL,
-        source_uri TEXT NOT NULL,
-        page_count INTEGER,
-        engine TEXT,
-        ingested_at TEXT NOT NULL
-    )
-    """)
-
-    cur.execute("""
+_CHUNKS_TABLE = """
     CREATE TABLE IF NOT EXISTS chunks (
         chunk_id TEXT PRIMARY KEY,
         doc_id TEXT NOT NULL,
@@ -29,22 +15,74 @@ def init_db(db_path: Path) -> None:
         page_start INTEGER,
         page_end INTEGER,
         exact_hash TEXT,
-        simhash64 TEXT,
+        simhash64 INTEGER,  -- signed two's complement of the 64-bit fingerprint
         char_len INTEGER,
         word_len INTEGER,
+        token_len INTEGER,
         lang TEXT,
         gibberish_score REAL,
         ingested_at TEXT NOT NULL,
         FOREIGN KEY(doc_id) REFERENCES docs(doc_id)
     )
+"""
+
+
+def init_db(db_path: Path) -> None:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(db_path))
+    cur = con.cursor()
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS docs (
+        doc_id TEXT PRIMARY KEY,
+        source_type TEXT NOT NULL,
+        source_uri TEXT NOT NULL,
+        page_count INTEGER,
+        engine TEXT,
+        ingested_at TEXT NOT NULL,
+        duplicate_of TEXT  -- doc_id of the kept document this one duplicates (no chunks of its own)
+    )
     """)
 
+    # Databases created before document-level dedupe
+    doc_cols = {r[1] for r in cur.execute("PRAGMA table_info(docs)")}
+    if "duplicate_of" not in doc_cols:
+        cur.execute("ALTER TABLE docs ADD COLUMN duplicate_of TEXT")
+
+    _migrate_text_simhash(cur)
+
+    cur.execute(_CHUNKS_TABLE)
+
+    # Databases created before token_len was added
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(chunks)")}
+    if "token_len" not in cols:
+        cur.execute("ALTER TABLE chunks ADD COLUMN token_len INTEGER")
+
     cur.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks(doc_id)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_chunks_exact_hash ON chunks(exact_hash)")
     con.commit()
     con.close()
 
 
+def _migrate_text_simhash(cur: sqlite3.Cursor) -> None:
+    # Databases from before simhash64 was an INTEGER column stored it as decimal text:
+    # rebuild the table and convert the values
+    cols = {r[1]: r[2] for r in cur.execute("PRAGMA table_info(chunks)")}
+    if cols.get("simhash64", "").upper() != "TEXT":
+        return
+    cur.execute("ALTER TABLE chunks RENAME TO chunks_text_simhash")
+    cur.execute("DROP INDEX IF EXISTS idx_chunks_doc_id")
+    cur.execute("DROP INDEX IF EXISTS idx_chunks_exact_hash")
+    cur.connection.create_function("to_int64", 1, lambda v: to_int64(int(v)) if v is not None else None)
+    cur.execute(_CHUNKS_TABLE)
+    keep = [c for c in cols if c != "simhash64"]
+    cur.execute(
+        f"INSERT INTO chunks({', '.join(keep)}, simhash64) "
+        f"SELECT {', '.join(keep)}, to_int64(simhash64) FROM chunks_text_simhash"
+    )
+    cur.execute("DROP TABLE chunks_text_simhash")
+
+
 def upsert_doc(
     db_path: Path,
     doc_id: str,
@@ -53,19 +91,21 @@ def upsert_doc(
     ingested_at: str,
     page_count: Optional[int] = None,
     engine: Optional[str] = None,
+    duplicate_of: Optional[str] = None,
 ) -> None:
     con = sqlite3.connect(str(db_path))
     cur = con.cursor()
     cur.execute("""
-    INSERT INTO docs(doc_id, source_type, source_uri, page_count, engine, ingested_at)
-    VALUES(?,?,?,?,?,?)
+    INSERT INTO docs(doc_id, source_type, source_uri, page_count, engine, ingested_at, duplicate_of)
+    VALUES(?,?,?,?,?,?,?)
     ON CONFLICT(doc_id) DO UPDATE SET
         source_type=excluded.source_type,
         source_uri=excluded.source_uri,
         page_count=excluded.page_count,
         engine=excluded.engine,
-        ingested_at=excluded.ingested_at
-    """, (doc_id, source_type, source_uri, page_count, engine, ingested_at))
+        ingested_at=excluded.ingested_at,
+        duplicate_of=excluded.duplicate_of
+    """, (doc_id, source_type, source_uri, page_count, engine, ingested_at, duplicate_of))
     con.commit()
     con.close()
 
@@ -76,15 +116,15 @@ def insert_chunks(db_path: Path, rows: Iterable[Dict[str, Any]]) -> None:
     cur.executemany("""
     INSERT OR REPLACE INTO chunks(
         chunk_id, doc_id, chunk_index, source_uri, page_start, page_end,
-        exact_hash, simhash64, char_len, word_len, lang, gibberish_score, ingested_at
+        exact_hash, simhash64, char_len, word_len, token_len, lang, gibberish_score, ingested_at
     )
-    VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)
+    VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?)
     """, [
         (
             r["chunk_id"], r["doc_id"], r["chunk_index"], r["source_uri"],
             r.get("page_start"), r.get("page_end"),
-            r.get("exact_hash"), str(r.get("simhash64")) if r.get("simhash64") is not None else None,
-            r.get("char_len"), r.get("word_len"),
+            r.get("exact_hash"), to_int64(r["simhash64"]) if r.get("simhash64") is not None else None,
+            r.get("char_len"), r.get("word_len"), r.get("token_len"),
             r.get("lang"), r.get("gibberish_score"),
             r["ingested_at"]
         )
@@ -92,3 +132,13 @@ def insert_chunks(db_path: Path, rows: Iterable[Dict[str, Any]]) -> None:
     ])
     con.commit()
     con.close()
+
+
+def load_chunk_hashes(db_path: Path) -> Tuple[List[str], List[int]]:
+    """
+    Exact hashes and (unsigned) SimHash fingerprints of every stored chunk.
+    """
+    con = sqlite3.connect(str(db_path))
+    rows = con.execute("SELECT exact_hash, simhash64 FROM chunks").fetchall()
+    con.close()
+    return [h for h, _ in rows if h], [from_int64(s) for _, s in rows if s is not None]